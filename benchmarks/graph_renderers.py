@@ -0,0 +1,108 @@
+"""Compare render time and memory of the graph renderer backends.
+
+Each backend runs in a fresh interpreter so import cost and peak RSS are
+measured in isolation::
+
+    python -m benchmarks.graph_renderers --runs 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from utils.graph_renderers import RENDERERS
+
+
+def _measure(renderer: str, runs: int) -> dict:
+    """Render the daily and monthly graphs ``runs`` times in this process."""
+    import resource
+
+    start = time.perf_counter()
+    from utils.graph_renderers import render_bar_chart
+
+    hours = [str(h) for h in range(24)]
+    dates = [f"{d:02d}.01" for d in range(1, 31)]
+    rng = random.Random(0)
+
+    first = None
+    timings = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        render_bar_chart(
+            hours,
+            [rng.randint(0, 12) for _ in hours],
+            title="Количество игроков по часам (сегодня)",
+            xlabel="Час",
+            ylabel="Игроки",
+            size=(10, 3),
+            renderer=renderer,
+        )
+        render_bar_chart(
+            dates,
+            [rng.randint(0, 40) for _ in dates],
+            title="Онлайн по дням (последние 30 дней)",
+            xlabel="Дата",
+            ylabel="Уникальные игроки",
+            size=(10, 4),
+            rotate_labels=True,
+            renderer=renderer,
+        )
+        elapsed = time.perf_counter() - began
+        if first is None:
+            first = time.perf_counter() - start
+        else:
+            timings.append(elapsed)
+
+    steady = sum(timings) / len(timings) if timings else first
+    # ru_maxrss — килобайты на Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "renderer": renderer,
+        "first_ms": first * 1000,
+        "steady_ms": steady * 1000,
+        "peak_rss_mb": rss_mb,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.runs)))
+        return
+
+    print(f"{'renderer':<12}{'first, ms':>12}{'steady, ms':>14}{'peak RSS, MB':>16}")
+    for renderer in RENDERERS:
+        out = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.graph_renderers",
+                "--child",
+                renderer,
+                "--runs",
+                str(args.runs),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "GRAPH_RENDERER": renderer},
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{result['renderer']:<12}{result['first_ms']:>12.1f}"
+            f"{result['steady_ms']:>14.1f}{result['peak_rss_mb']:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
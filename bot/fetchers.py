@@ -1,6 +1,9 @@
 """Helpers for fetching files from the API."""
 
-from typing import Optional, Tuple
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
@@ -10,7 +13,7 @@ import time
 
 from config.config import config
 from utils.logger import log_debug
-from ftp.fetcher import fetch_files
+from ftp.fetcher import fetch_files_if_modified
 
 
 def _mask_url_param(url: str, param: str = "code", mask: str = "***") -> str:
@@ -38,12 +41,72 @@ async def _fetch(session: aiohttp.ClientSession, url: str, desc: str) -> Optiona
         return None
 
 
-async def fetch_api_file(
+@dataclass
+class _Validators:
+    """Validators and body of the last successful response for a URL."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: str
+    body: bytes
+
+
+_validators: Dict[str, _Validators] = {}
+
+
+async def _fetch_if_modified(
+    session: aiohttp.ClientSession, url: str, desc: str
+) -> Tuple[Optional[bytes], bool]:
+    """Fetch ``url`` conditionally and report whether the body changed.
+
+    ETag/Last-Modified are sent back when the server provided them. If the
+    server ignores them, the body hash is compared with the previous one.
+    The body is returned as raw bytes for the streaming XML parser.
+    """
+    safe_url = _mask_url_param(url)
+    cached = _validators.get(url)
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    log_debug(f"[API] Загружаем {desc} по адресу: {safe_url}")
+    try:
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached is not None:
+                log_debug(f"[API] {desc} не изменился (304)")
+                return cached.body, False
+            resp.raise_for_status()
+            raw = await resp.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if cached is not None and cached.digest == digest:
+                log_debug(f"[API] {desc} не изменился (hash)")
+                body = cached.body
+            else:
+                body = raw
+            _validators[url] = _Validators(
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                digest=digest,
+                body=body,
+            )
+            log_debug(f"[API] {desc} загружен успешно.")
+            return body, cached is None or cached.digest != digest
+    except Exception as e:
+        log_debug(f"[API] ❌ Ошибка загрузки {desc}: {e}")
+        return None, True
+
+
+def _api_file_url(filename: str) -> str:
+    return f"{config.api_base_url}?file={filename}&code={config.api_secret_code}"
+
+
+async def fetch_api_file_if_modified(
     session: aiohttp.ClientSession, filename: str
-) -> Optional[str]:
-    """Download a file from the API by name."""
-    url = f"{config.api_base_url}?file={filename}&code={config.api_secret_code}"
-    return await _fetch(session, url, filename)
+) -> Tuple[Optional[bytes], bool]:
+    """Download a file from the API and report whether it changed."""
+    return await _fetch_if_modified(session, _api_file_url(filename), filename)
 
 
 async def fetch_dedicated_server_stats(session: aiohttp.ClientSession) -> Optional[str]:
@@ -58,52 +121,181 @@ async def fetch_dedicated_server_stats(session: aiohttp.ClientSession) -> Option
     return await _fetch(session, url, "dedicated-server-stats.xml")
 
 
-_stats_cache: tuple[Optional[str], float] = (None, 0.0)
+class SharedFetchCache:
+    """In-memory cache that coalesces concurrent downloads into one request.
+
+    Every caller states how old a cached value it is willing to accept.
+    Callers that miss the cache while a download is already running wait for
+    that download instead of starting their own.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[aiohttp.ClientSession], Awaitable[Optional[str]]],
+        desc: str,
+    ) -> None:
+        self._fetch = fetch
+        self._desc = desc
+        self._data: Optional[str] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def get(
+        self, session: aiohttp.ClientSession, *, max_age: float
+    ) -> Optional[str]:
+        """Return data not older than ``max_age`` seconds."""
+        if self._data is not None and time.monotonic() - self._fetched_at <= max_age:
+            log_debug(f"[API] Using cached {self._desc}")
+            return self._data
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._refresh(session))
+        else:
+            log_debug(f"[API] Waiting for in-flight {self._desc}")
+        # shield: a cancelled caller must not cancel the download for others
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self, session: aiohttp.ClientSession) -> Optional[str]:
+        started = time.monotonic()
+        try:
+            data = await self._fetch(session)
+            if data:
+                self._data = data
+                self._fetched_at = started
+            return data
+        finally:
+            self._inflight = None
+
+
+_stats_cache = SharedFetchCache(
+    fetch_dedicated_server_stats, "dedicated-server-stats.xml"
+)
 
 
 async def fetch_dedicated_server_stats_cached(
-    session: aiohttp.ClientSession, *, ttl: int = 120
+    session: aiohttp.ClientSession, *, max_age: float = config.stats_max_age_embed
 ) -> Optional[str]:
-    """Fetch stats XML with simple in-memory caching."""
-    global _stats_cache
-    data, ts = _stats_cache
-    now = time.monotonic()
-    if data is not None and now - ts < ttl:
-        log_debug("[API] Using cached dedicated-server-stats.xml")
-        return data
-    data = await fetch_dedicated_server_stats(session)
-    if data:
-        _stats_cache = (data, now)
-    return data
+    """Fetch stats XML through the shared single-flight cache."""
+    return await _stats_cache.get(session, max_age=max_age)
+
+
+# Sources that can be reported as unchanged since the previous cycle
+CONDITIONAL_SOURCES = frozenset(
+    {"vehicles", "careerAPI", "careerFTP", "farmlandFTP", "farms"}
+)
+
+
+@dataclass
+class FetchReport:
+    """Per-source timings of a single fetch stage."""
+
+    timings: Dict[str, float] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    unchanged: Set[str] = field(default_factory=set)
+
+    @property
+    def slowest(self) -> Optional[str]:
+        """Name of the source that took the longest."""
+        if not self.timings:
+            return None
+        return max(self.timings, key=self.timings.__getitem__)
+
+    def summary(self) -> str:
+        """Human readable timings for logging."""
+        parts = [f"{name}={elapsed:.2f}s" for name, elapsed in self.timings.items()]
+        if self.timed_out:
+            parts.append(f"timeout={','.join(self.timed_out)}")
+        if self.unchanged:
+            parts.append(f"unchanged={','.join(sorted(self.unchanged))}")
+        return ", ".join(parts)
+
+
+async def _run_source(
+    name: str, coro: Awaitable[Any], deadline: float, report: FetchReport
+) -> Any:
+    """Await ``coro`` within ``deadline`` seconds and record its timing."""
+    start = time.monotonic()
+    try:
+        return await asyncio.wait_for(coro, timeout=deadline)
+    except asyncio.TimeoutError:
+        log_debug(f"[FETCH] ⏱ {name} не уложился в {deadline} с")
+        report.timed_out.append(name)
+        return None
+    except Exception as e:
+        log_debug(f"[FETCH] ❌ Ошибка источника {name}: {e}")
+        return None
+    finally:
+        report.timings[name] = time.monotonic() - start
 
 
 async def fetch_required_files(
     session: aiohttp.ClientSession,
+    *,
+    deadline: float = config.fetch_source_timeout,
 ) -> Tuple[
-    Optional[str],
-    Optional[str],
-    Optional[str],
-    Optional[str],
-    Optional[str],
-    Optional[str],
+    Tuple[
+        Optional[str],
+        Optional[bytes],
+        Optional[bytes],
+        Optional[bytes],
+        Optional[bytes],
+        Optional[bytes],
+    ],
+    FetchReport,
 ]:
-    """Fetch all files required for building server stats."""
-    log_debug("[API] Получаем dedicated-server-stats.xml")
-    stats_xml = await fetch_dedicated_server_stats_cached(session)
-    log_debug("[API] Получаем vehicles")
-    vehicles_xml = await fetch_api_file(session, "vehicles")
-    log_debug("[API] Получаем careerSavegame из API")
-    career_api_xml = await fetch_api_file(session, "careerSavegame")
-
-    career_ftp, farmland_ftp, farms_ftp = await fetch_files(
-        "careerSavegame.xml", "farmland.xml", "farms.xml"
+    """Fetch all files required for building server stats concurrently.
+
+    HTTP sources and the FTP session run at the same time, each limited by
+    ``deadline`` seconds. Sources that fail or time out are returned as
+    ``None`` so the caller can work with partial results.
+    """
+    report = FetchReport()
+    log_debug("[API] Получаем stats, vehicles, careerSavegame и файлы FTP")
+    stats_xml, vehicles, career_api, ftp_files = await asyncio.gather(
+        _run_source(
+            "stats", fetch_dedicated_server_stats_cached(session), deadline, report
+        ),
+        _run_source(
+            "vehicles",
+            fetch_api_file_if_modified(session, "vehicles"),
+            deadline,
+            report,
+        ),
+        _run_source(
+            "careerAPI",
+            fetch_api_file_if_modified(session, "careerSavegame"),
+            deadline,
+            report,
+        ),
+        _run_source(
+            "ftp",
+            fetch_files_if_modified("careerSavegame.xml", "farmland.xml", "farms.xml"),
+            deadline,
+            report,
+        ),
     )
+    vehicles_xml, vehicles_modified = vehicles or (None, True)
+    career_api_xml, career_api_modified = career_api or (None, True)
+    if not vehicles_modified:
+        report.unchanged.add("vehicles")
+    if not career_api_modified:
+        report.unchanged.add("careerAPI")
+
+    career_ftp = farmland_ftp = farms_ftp = None
+    if ftp_files:
+        for name, ftp_file in zip(("careerFTP", "farmlandFTP", "farms"), ftp_files):
+            if not ftp_file.modified:
+                report.unchanged.add(name)
+        career_ftp, farmland_ftp, farms_ftp = (f.content for f in ftp_files)
+    log_debug(f"[FETCH] Тайминги: {report.summary()}; самый медленный: {report.slowest}")
 
     return (
-        stats_xml,
-        vehicles_xml,
-        career_api_xml,
-        career_ftp,
-        farmland_ftp,
-        farms_ftp,
+        (
+            stats_xml,
+            vehicles_xml,
+            career_api_xml,
+            career_ftp,
+            farmland_ftp,
+            farms_ftp,
+        ),
+        report,
     )
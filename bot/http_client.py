@@ -0,0 +1,21 @@
+"""Shared HTTP client used by all background tasks."""
+
+import aiohttp
+
+from config.config import config
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """Create a client session with keep-alive and DNS caching.
+
+    Must be called from a running event loop. The owner is responsible for
+    closing the session.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.http_pool_limit,
+        limit_per_host=config.http_pool_limit_per_host,
+        ttl_dns_cache=config.http_dns_cache_ttl,
+        keepalive_timeout=config.http_keepalive_timeout,
+    )
+    timeout = aiohttp.ClientTimeout(total=config.http_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
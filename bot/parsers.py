@@ -1,11 +1,109 @@
+import hashlib
+import threading
 import xml.etree.ElementTree as ET
-from typing import Tuple, Optional, Dict
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Tuple, Optional, Dict, TypeVar, Union
 
 from utils.logger import log_debug
 
+# XML как пришёл из источника: байты без декодирования или строка
+XmlSource = Union[str, bytes]
+
+T = TypeVar("T")
+
+
+class DocumentCache:
+    """Кеш разобранных XML-документов по хешу содержимого.
+
+    Каждый источник разбирается один раз за цикл, все извлекающие функции
+    читают одно и то же дерево. Если содержимое не изменилось с прошлого
+    опроса, используется прежнее дерево или результат подсчёта.
+
+    После цикла разбора (:meth:`cycle`) остаются только записи, прочитанные
+    в этом цикле, — по одной на источник. Деревья прошлых версий файлов
+    сразу освобождаются, ``max_entries`` лишь ограничивает кеш сверху.
+    """
+
+    def __init__(self, max_entries: int = 16) -> None:
+        self._entries: "OrderedDict[tuple[str, str], Any]" = OrderedDict()
+        self._max_entries = max_entries
+        self._used: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(xml_data: XmlSource) -> str:
+        """Хеш содержимого документа."""
+        data = xml_data.encode("utf-8") if isinstance(xml_data, str) else xml_data
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get_or_compute(
+        self, xml_data: XmlSource, kind: str, compute: Callable[[], T]
+    ) -> T:
+        """Возвращает сохранённый результат ``kind`` или вычисляет его."""
+        key = (kind, self.content_key(xml_data))
+        with self._lock:
+            self._used.add(key)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def tree(self, xml_data: XmlSource) -> ET.Element:
+        """Корень документа; не изменяйте возвращаемое дерево."""
+        return self.get_or_compute(xml_data, "tree", lambda: ET.fromstring(xml_data))
+
+    @contextmanager
+    def cycle(self) -> Iterator[None]:
+        """Цикл разбора: по выходе удаляются записи, не прочитанные в нём."""
+        with self._lock:
+            self._used = set()
+        try:
+            yield
+        finally:
+            with self._lock:
+                for key in [k for k in self._entries if k not in self._used]:
+                    del self._entries[key]
+
+
+document_cache = DocumentCache()
+
+# Размер порции, которой байты подаются инкрементальному парсеру
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_elements(xml_data: XmlSource, *tags: str) -> Iterator[ET.Element]:
+    """Потоково перебирает элементы с заданными тегами.
+
+    Данные подаются ``XMLPullParser`` порциями, а каждый найденный элемент
+    после обработки очищается и удаляется из родителя, поэтому дерево
+    документа целиком в памяти не строится.
+    """
+    wanted = set(tags)
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack: list[ET.Element] = []
+    for offset in range(0, len(xml_data), _STREAM_CHUNK_SIZE):
+        parser.feed(xml_data[offset : offset + _STREAM_CHUNK_SIZE])
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag in wanted:
+                yield elem
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+    parser.close()
+
 
 def parse_server_stats(
-    xml_text: str,
+    xml_text: XmlSource,
 ) -> Tuple[
     Optional[str],
     Optional[str],
@@ -16,7 +114,7 @@ def parse_server_stats(
 ]:
     """Извлекает общую информацию о сервере и время в игре."""
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
         server_elem = root  # <Server> — корень
 
         server_name = server_elem.get("name")
@@ -95,10 +193,10 @@ def parse_server_stats(
         return None, None, None, None, None, None
 
 
-def parse_farm_money(xml_text: str) -> Optional[int]:
+def parse_farm_money(xml_text: XmlSource) -> Optional[int]:
     """Получает баланс фермы из careerSavegame.xml на FTP."""
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
         elem = root.find(".//statistics/money")
         if elem is not None and elem.text:
             try:
@@ -111,10 +209,10 @@ def parse_farm_money(xml_text: str) -> Optional[int]:
         return None
 
 
-def parse_time_scale(xml_text: str) -> Optional[float]:
+def parse_time_scale(xml_text: XmlSource) -> Optional[float]:
     """Извлекает ``timeScale`` из careerSavegame.xml."""
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
         settings = root.find(".//settings")
         if settings is not None:
             ts = settings.get("timeScale")
@@ -136,10 +234,10 @@ def parse_time_scale(xml_text: str) -> Optional[float]:
         return None
 
 
-def parse_play_time(xml_text: str) -> Optional[float]:
+def parse_play_time(xml_text: XmlSource) -> Optional[float]:
     """Возвращает общее время игры в минутах из careerSavegame.xml."""
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
         elem = root.find(".//playTime")
         if elem is not None and elem.text:
             try:
@@ -161,10 +259,10 @@ def parse_play_time(xml_text: str) -> Optional[float]:
         return None
 
 
-def parse_day_time(xml_text: str) -> Optional[int]:
+def parse_day_time(xml_text: XmlSource) -> Optional[int]:
     """Возвращает текущее игровое время из XML."""
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
 
         def _extract(node):
             if node is None:
@@ -205,46 +303,67 @@ def parse_day_time(xml_text: str) -> Optional[int]:
         return None
 
 
-def _count_vehicles(xml_text: str, farm_id: str) -> Optional[int]:
+def _count_vehicles(xml_text: XmlSource, farm_id: str) -> Optional[int]:
     """Подсчёт техники в файле vehicles."""
-    try:
-        root = ET.fromstring(xml_text)
-        vehicles = root.findall(".//vehicle")
-        if not vehicles:
-            return 0
+    return document_cache.get_or_compute(
+        xml_text,
+        f"vehicles:{farm_id}",
+        lambda: _count_vehicles_stream(xml_text, farm_id),
+    )
 
-        keywords = ["pallet", "tree", "wood", "object", "trailerWood", "camera"]
 
-        has_farmid = any(v.get("farmId") is not None for v in vehicles)
-        if not has_farmid:
-            return None
+def _count_vehicles_stream(xml_text: XmlSource, farm_id: str) -> Optional[int]:
+    try:
+        keywords = ["pallet", "tree", "wood", "object", "trailerWood", "camera"]
 
+        seen = 0
+        has_farmid = False
         count = 0
-        for v in vehicles:
-            if v.get("farmId") == farm_id:
+        for v in iter_elements(xml_text, "vehicle"):
+            seen += 1
+            vehicle_farm = v.get("farmId")
+            if vehicle_farm is None:
+                continue
+            has_farmid = True
+            if vehicle_farm == farm_id:
                 filename = v.get("filename", "")
                 if not any(k in filename for k in keywords):
                     count += 1
+
+        if not seen:
+            return 0
+        if not has_farmid:
+            return None
         return count
     except Exception as e:
         log_debug(f"[ERROR] _count_vehicles: {e}")
         return None
 
 
-def parse_farmland(xml_text: str, farm_id: str) -> Tuple[int, int]:
+def parse_farmland(xml_text: XmlSource, farm_id: str) -> Tuple[int, int]:
     """Подсчитывает количество полей у фермы."""
+    return document_cache.get_or_compute(
+        xml_text,
+        f"farmland:{farm_id}",
+        lambda: _parse_farmland_stream(xml_text, farm_id),
+    )
+
+
+def _parse_farmland_stream(xml_text: XmlSource, farm_id: str) -> Tuple[int, int]:
     try:
-        root = ET.fromstring(xml_text)
-        farmlands = root.findall(".//Farmland") or root.findall(".//farmland")
-        total = len(farmlands)
-        owned = len([f for f in farmlands if f.get("farmId") == farm_id])
+        total = 0
+        owned = 0
+        for f in iter_elements(xml_text, "Farmland", "farmland"):
+            total += 1
+            if f.get("farmId") == farm_id:
+                owned += 1
         return owned, total
     except Exception as e:
         log_debug(f"[ERROR] parse_farmland: {e}")
         return 0, 0
 
 
-def parse_players_online(xml_text: str) -> list:
+def parse_players_online(xml_text: XmlSource) -> list:
     """Возвращает список ников онлайн-игроков из dedicated-server-stats.xml.
 
     Если функция возвращает пустой список, проверьте:
@@ -253,7 +372,7 @@ def parse_players_online(xml_text: str) -> list:
       * нет ли ошибок в логах.
     """
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
         players = []
         slots = root.find(".//Slots")
         if slots is not None:
@@ -268,10 +387,10 @@ def parse_players_online(xml_text: str) -> list:
         return []
 
 
-def parse_last_month_profit(xml_text: str) -> Optional[int]:
+def parse_last_month_profit(xml_text: XmlSource) -> Optional[int]:
     """Возвращает округлённую прибыль за последний месяц (day=1) из farms.xml"""
     try:
-        root = ET.fromstring(xml_text)
+        root = document_cache.tree(xml_text)
         stats = root.find(".//farm[@farmId='1']/finances/stats[@day='4']")
         if stats is None:
             return None
@@ -289,15 +408,16 @@ def parse_last_month_profit(xml_text: str) -> Optional[int]:
         return None
 
 
+@document_cache.cycle()
 def parse_all(
-    server_stats: str,
-    vehicles_api: str,
-    career_savegame_ftp: str,
-    farmland_ftp: str,
-    career_savegame_api: Optional[str] = None,
-    vehicles_ftp: Optional[str] = None,
-    farms_xml: Optional[str] = None,
-    dedicated_server_stats: Optional[str] = None,
+    server_stats: XmlSource,
+    vehicles_api: XmlSource,
+    career_savegame_ftp: XmlSource,
+    farmland_ftp: XmlSource,
+    career_savegame_api: Optional[XmlSource] = None,
+    vehicles_ftp: Optional[XmlSource] = None,
+    farms_xml: Optional[XmlSource] = None,
+    dedicated_server_stats: Optional[XmlSource] = None,
     farm_id: str = "1",
 ) -> Dict[str, Optional[int]]:
     """Собирает все данные из разных источников и возвращает единую структуру."""
@@ -0,0 +1,58 @@
+"""Adaptive schedule for the server status polling loop."""
+
+import random
+from typing import Optional
+
+from config.config import config
+
+
+class AdaptivePollScheduler:
+    """Choose the pause before the next poll from the server state.
+
+    * players online or a status change — poll every ``active_interval``;
+    * server up but empty — poll every ``idle_interval``;
+    * server unreachable — back off exponentially from ``active_interval``
+      up to ``max_interval``.
+
+    The result is randomised by ``jitter`` and shortened by the duration of
+    the cycle that just finished so the schedule does not drift.
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_interval: float = config.ftp_poll_interval,
+        active_interval: float = config.ftp_poll_active_interval,
+        max_interval: float = config.ftp_poll_max_interval,
+        jitter: float = config.ftp_poll_jitter,
+    ) -> None:
+        self._idle_interval = idle_interval
+        self._active_interval = active_interval
+        self._max_interval = max_interval
+        self._jitter = jitter
+        self._failures = 0
+        self._last_up: Optional[bool] = None
+
+    def base_interval(self, *, server_up: bool, players_online: int) -> float:
+        """Interval before jitter and cycle-time compensation."""
+        status_changed = self._last_up is not None and self._last_up != server_up
+        self._last_up = server_up
+        if not server_up:
+            self._failures += 1
+            return min(
+                self._active_interval * 2 ** (self._failures - 1), self._max_interval
+            )
+        self._failures = 0
+        if players_online > 0 or status_changed:
+            return self._active_interval
+        return self._idle_interval
+
+    def next_delay(
+        self, *, server_up: bool, players_online: int, cycle_duration: float
+    ) -> float:
+        """Seconds to sleep before the next cycle starts."""
+        interval = self.base_interval(
+            server_up=server_up, players_online=players_online
+        )
+        interval *= random.uniform(1 - self._jitter, 1 + self._jitter)
+        return max(0.0, interval - cycle_duration)
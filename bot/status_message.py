@@ -0,0 +1,70 @@
+"""Publishing the server status message to the Discord channel."""
+
+from typing import Callable
+
+import discord
+
+from config.config import config
+from utils.bot_state import get_state, set_state
+from utils.logger import log_debug
+
+STATUS_MESSAGE_KEY = "status_message_id"
+
+
+async def _repost(
+    bot: discord.Client,
+    channel: discord.abc.Messageable,
+    embed: discord.Embed,
+    file: discord.File,
+) -> discord.Message:
+    """Delete recent bot messages and send a new status message."""
+    async for msg in channel.history(limit=config.message_cleanup_limit):
+        if msg.author == bot.user:
+            log_debug(f"[Discord] Удаляем сообщение {msg.id}")
+            try:
+                await msg.delete()
+            except Exception as e:
+                log_debug(f"[Discord] Не удалось удалить сообщение: {e}")
+
+    log_debug("[Discord] Отправляем сообщение")
+    return await channel.send(embed=embed, files=[file])
+
+
+async def publish_status(
+    bot: discord.Client,
+    channel: discord.abc.Messageable,
+    embed: discord.Embed,
+    make_file: Callable[[], discord.File],
+) -> None:
+    """Show ``embed`` in the status message.
+
+    The id of the status message is kept in ``bot_state``; while that message
+    exists it is updated with a single ``edit`` call. History cleanup and a
+    new post happen only when the message is missing or cannot be edited.
+    ``make_file`` is called for every attempt because discord.py closes the
+    file after a request.
+    """
+    if config.status_message_edit:
+        try:
+            message_id = await get_state(bot.db_pool, STATUS_MESSAGE_KEY)
+        except Exception as e:
+            log_debug(f"[DB] Ошибка чтения id сообщения: {e}")
+            message_id = None
+
+        if message_id:
+            message = channel.get_partial_message(int(message_id))
+            try:
+                await message.edit(embed=embed, attachments=[make_file()])
+                log_debug(f"[Discord] Сообщение {message_id} обновлено")
+                return
+            except discord.NotFound:
+                log_debug(f"[Discord] Сообщение {message_id} не найдено")
+            except discord.HTTPException as e:
+                log_debug(f"[Discord] Не удалось изменить сообщение: {e}")
+
+    message = await _repost(bot, channel, embed, make_file())
+    if config.status_message_edit:
+        try:
+            await set_state(bot.db_pool, STATUS_MESSAGE_KEY, str(message.id))
+        except Exception as e:
+            log_debug(f"[DB] Ошибка сохранения id сообщения: {e}")
@@ -1,13 +1,12 @@
 """Background tasks for updating and storing server information."""
 
 import asyncio
+import io
 from datetime import timedelta
 
 from utils.helpers import get_moscow_datetime
 
-import aiohttp
 import discord
-import json
 
 from config.config import (
     config,
@@ -16,19 +15,32 @@ from config.config import (
     ONLINE_DAILY_GRAPH_FILENAME,
 )
 from .fetchers import (
+    CONDITIONAL_SOURCES,
     fetch_dedicated_server_stats_cached,
     fetch_required_files,
 )
 from .parsers import parse_all, parse_players_online
 from .discord_ui import build_embed
+from .scheduler import AdaptivePollScheduler
+from .status_message import publish_status
 from utils.online_daily_graph import (
-    save_daily_online_graph,
+    build_daily_online_graph,
     fetch_daily_online_counts,
 )
+from utils.history_partitions import drop_expired_partitions, ensure_partitions
 from utils.logger import log_debug
+from utils.online_history import save_online_slice
+from utils.worker_pool import worker_pool
 import time
 
 
+def _changed_fields(old: dict | None, new: dict) -> list[str]:
+    """Возвращает имена полей снимка, значения которых изменились."""
+    if old is None:
+        return sorted(new)
+    return sorted(k for k in old.keys() | new.keys() if old.get(k) != new.get(k))
+
+
 async def ftp_polling_task(bot: discord.Client) -> None:
     """Periodically send server stats to Discord every polling interval."""
     log_debug("[TASK] Запущен ftp_polling_task")
@@ -38,14 +50,19 @@ async def ftp_polling_task(bot: discord.Client) -> None:
         log_debug("❌ Канал не найден!")
         return
 
-    timeout = aiohttp.ClientTimeout(total=config.http_timeout)
-    last_snapshot: str | None = None
+    last_snapshot: dict | None = None
+    last_published_at = float("-inf")
     last_play_time_check: float = 0.0
     last_play_time_value: float | None = None
+    last_parsed: dict | None = None
+    last_stats_xml: str | None = None
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        while not bot.is_closed():
-            try:
+    session = bot.http_session
+    scheduler = AdaptivePollScheduler()
+    while not bot.is_closed():
+        try:
+            cycle_start = time.monotonic()
+            (
                 (
                     stats_xml,
                     vehicles_xml,
@@ -53,33 +70,46 @@ async def ftp_polling_task(bot: discord.Client) -> None:
                     career_ftp,
                     farmland_ftp,
                     farms_ftp,
-                ) = await fetch_required_files(session)
-                dedicated_server_stats_ftp = stats_xml
+                ),
+                fetch_report,
+            ) = await fetch_required_files(session)
+            dedicated_server_stats_ftp = stats_xml
 
-                log_debug(
-                    "[DEBUG] Статусы: "
-                    f"stats={bool(stats_xml)}, "
-                    f"vehicles={bool(vehicles_xml)}, "
-                    f"careerAPI={bool(career_api_xml)}, "
-                    f"careerFTP={bool(career_ftp)}, "
-                    f"farmlandFTP={bool(farmland_ftp)}, "
-                    f"farms={bool(farms_ftp)}"
-                )
+            log_debug(
+                "[DEBUG] Статусы: "
+                f"stats={bool(stats_xml)}, "
+                f"vehicles={bool(vehicles_xml)}, "
+                f"careerAPI={bool(career_api_xml)}, "
+                f"careerFTP={bool(career_ftp)}, "
+                f"farmlandFTP={bool(farmland_ftp)}, "
+                f"farms={bool(farms_ftp)}, "
+                f"slowest={fetch_report.slowest}"
+            )
 
-                all_files_loaded = all(
-                    [
-                        stats_xml,
-                        vehicles_xml,
-                        career_api_xml,
-                        career_ftp,
-                        farmland_ftp,
-                        farms_ftp,
-                    ]
-                )
-                if all_files_loaded:
-                    server_status = "🟢 Сервер работает"
-                    log_debug("[FTP] Все необходимые файлы загружены")
-                    data = parse_all(
+            all_files_loaded = all(
+                [
+                    stats_xml,
+                    vehicles_xml,
+                    career_api_xml,
+                    career_ftp,
+                    farmland_ftp,
+                    farms_ftp,
+                ]
+            )
+            if all_files_loaded:
+                server_status = "🟢 Сервер работает"
+                log_debug("[FTP] Все необходимые файлы загружены")
+                if (
+                    last_parsed is not None
+                    and stats_xml == last_stats_xml
+                    and fetch_report.unchanged >= CONDITIONAL_SOURCES
+                ):
+                    log_debug("[PARSE] Источники не изменились, разбор пропущен")
+                    data = dict(last_parsed)
+                else:
+                    data = await worker_pool.run(
+                        "parse_all",
+                        parse_all,
                         server_stats=stats_xml,
                         vehicles_api=vehicles_xml,
                         career_savegame_ftp=career_ftp,
@@ -88,168 +118,144 @@ async def ftp_polling_task(bot: discord.Client) -> None:
                         farms_xml=farms_ftp,
                         dedicated_server_stats=dedicated_server_stats_ftp,
                     )
-                else:
-                    server_status = "🔴 Сервер недоступен"
-                    data = {
-                        "last_month_profit": None,
-                        "server_name": None,
-                        "map_name": None,
-                        "slots_used": None,
-                        "slots_max": None,
-                        "farm_money": None,
-                        "fields_owned": None,
-                        "fields_total": None,
-                        "vehicles_owned": None,
-                        "day_time": None,
-                        "time_scale": None,
-                        "play_time": None,
-                        "players_online": [],
-                    }
-
-                data["server_status"] = server_status
-
-                play_time_new = data.get("play_time")
-                now = time.monotonic()
-                if (
-                    play_time_new is not None
-                    and last_play_time_value is not None
-                    and (
-                        now - last_play_time_check < 3600
-                        or play_time_new == last_play_time_value
-                    )
-                ):
-                    data["play_time"] = last_play_time_value
-                else:
-                    if play_time_new is not None:
-                        last_play_time_value = play_time_new
-                        last_play_time_check = now
-
-                new_day_time = data.get("day_time")
+                    last_parsed = dict(data)
+                    last_stats_xml = stats_xml
+            else:
+                server_status = "🔴 Сервер недоступен"
+                data = {
+                    "last_month_profit": None,
+                    "server_name": None,
+                    "map_name": None,
+                    "slots_used": None,
+                    "slots_max": None,
+                    "farm_money": None,
+                    "fields_owned": None,
+                    "fields_total": None,
+                    "vehicles_owned": None,
+                    "day_time": None,
+                    "time_scale": None,
+                    "play_time": None,
+                    "players_online": [],
+                }
 
-                embed = build_embed(data)
+            data["server_status"] = server_status
 
-                hourly_counts = await fetch_daily_online_counts(bot.db_pool)
+            play_time_new = data.get("play_time")
+            now = time.monotonic()
+            if (
+                play_time_new is not None
+                and last_play_time_value is not None
+                and (
+                    now - last_play_time_check < 3600
+                    or play_time_new == last_play_time_value
+                )
+            ):
+                data["play_time"] = last_play_time_value
+            else:
+                if play_time_new is not None:
+                    last_play_time_value = play_time_new
+                    last_play_time_check = now
 
-                image_path = save_daily_online_graph(hourly_counts)
+            hourly_counts = await fetch_daily_online_counts(bot.db_pool)
+            # Подписи оси зависят от текущего часа, поэтому он часть ключа
+            graph_key = (get_moscow_datetime().hour, tuple(hourly_counts))
+            embed = build_embed(data)
+            # Сравниваем то, что видно в сообщении: текст embed'а без подвала
+            # со временем обновления и график. Поля, которых нет в тексте
+            # (деньги фермы, прибыль и т.п.), не вызывают публикацию.
+            snapshot = {"description": embed.description, "hourly_graph": graph_key}
+            changed = _changed_fields(last_snapshot, snapshot)
+            expired = time.monotonic() - last_published_at >= config.status_max_age
+            if changed or expired:
+                log_debug(
+                    "[Discord] Обновляем статус: "
+                    f"{', '.join(changed) if changed else 'истёк срок'}"
+                )
                 embed.set_image(url=f"attachment://{ONLINE_DAILY_GRAPH_FILENAME}")
-
-                snapshot_data = {
-                    "data": data,
-                    "counts": hourly_counts,
-                    "day_time": new_day_time,
-                    "play_time": last_play_time_value,
-                    "play_time_check": last_play_time_check,
-                }
-                last_snapshot = json.dumps(snapshot_data, sort_keys=True)
-
-                file = discord.File(
-                    image_path, filename=ONLINE_DAILY_GRAPH_FILENAME
+                png = (await build_daily_online_graph(hourly_counts)).getvalue()
+                await publish_status(
+                    bot,
+                    channel,
+                    embed,
+                    lambda: discord.File(
+                        io.BytesIO(png), filename=ONLINE_DAILY_GRAPH_FILENAME
+                    ),
                 )
+                last_snapshot = snapshot
+                last_published_at = time.monotonic()
+            else:
+                log_debug("[Discord] Данные не изменились, сообщение не обновляем")
 
-                async for msg in channel.history(
-                    limit=config.message_cleanup_limit
-                ):
-                    if msg.author == bot.user:
-                        log_debug(f"[Discord] Удаляем сообщение {msg.id}")
-                        try:
-                            await msg.delete()
-                        except Exception as e:
-                            log_debug(
-                                f"[Discord] Не удалось удалить сообщение: {e}"
-                            )
-
-                log_debug("[Discord] Отправляем сообщение")
-                await channel.send(embed=embed, files=[file])
-
-                await asyncio.sleep(config.ftp_poll_interval)
-            except asyncio.CancelledError:
-                log_debug("[TASK] ftp_polling_task cancelled")
-                break
-            except Exception as e:
-                log_debug(f"[TASK] ftp_polling_task error: {e}")
-                await asyncio.sleep(5)
+            delay = scheduler.next_delay(
+                server_up=all_files_loaded,
+                players_online=len(data.get("players_online") or []),
+                cycle_duration=time.monotonic() - cycle_start,
+            )
+            log_debug(f"[TASK] Следующий опрос через {int(delay)} секунд")
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log_debug("[TASK] ftp_polling_task cancelled")
+            break
+        except Exception as e:
+            log_debug(f"[TASK] ftp_polling_task error: {e}")
+            await asyncio.sleep(5)
 
 
 async def save_online_history_task(bot: discord.Client) -> None:
     """Сохраняет список онлайн-игроков в строго заданные минуты часа."""
     log_debug("[TASK] Запущен save_online_history_task")
     await bot.wait_until_ready()
-    timeout = aiohttp.ClientTimeout(total=config.http_timeout)
     step = config.online_slice_minutes
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        while not bot.is_closed():
-            try:
-                now = get_moscow_datetime()
-                minute = now.minute
-                log_debug(f"[ONLINE] Текущее время: {now.strftime('%Y-%m-%d %H:%M:%S')}")
-
-                if minute % step == 0:
-                    start_min = now.replace(second=0, microsecond=0)
-                    log_debug("[ONLINE] Приступаем к сохранению среза")
-                    try:
-                        exists = await bot.db_pool.fetchval(
-                            "SELECT 1 FROM player_online_history WHERE check_time >= $1 AND check_time < $2 LIMIT 1",
-                            start_min,
-                            start_min + timedelta(minutes=1),
-                        )
-                    except Exception as db_e:
-                        log_debug(f"[DB] Ошибка проверки истории: {db_e}")
-                        exists = True
-
-                    if exists:
-                        log_debug("[ONLINE] Срез уже был, пропускаем")
-                    else:
-                        xml = await fetch_dedicated_server_stats_cached(session)
-                        players = parse_players_online(xml) if xml else []
-                        log_debug(f"[ONLINE] Игроки онлайн: {players}")
-                        records = [
-                            (name, now.replace(tzinfo=None)) for name in players
-                        ]
-                        if records:
-                            try:
-                                await bot.db_pool.executemany(
-                                    """
-                                    INSERT INTO player_online_history (
-                                        player_name, check_time, date, hour, dow
-                                    ) VALUES (
-                                        $1, $2, DATE($2), EXTRACT(HOUR FROM $2), EXTRACT(DOW FROM $2)
-                                    )
-                                    """,
-                                    records,
-                                )
-                                log_debug(f"[DB] Добавлено записей: {len(records)}")
-                            except Exception as db_e:
-                                log_debug(f"[DB] Ошибка записи игрока: {db_e}")
+    session = bot.http_session
+    while not bot.is_closed():
+        try:
+            now = get_moscow_datetime()
+            minute = now.minute
+            log_debug(f"[ONLINE] Текущее время: {now.strftime('%Y-%m-%d %H:%M:%S')}")
 
-                next_slice = (
-                    now.replace(second=0, microsecond=0)
-                    + timedelta(minutes=step - (now.minute % step))
+            if minute % step == 0:
+                start_min = now.replace(second=0, microsecond=0, tzinfo=None)
+                log_debug("[ONLINE] Приступаем к сохранению среза")
+                xml = await fetch_dedicated_server_stats_cached(
+                    session, max_age=config.stats_max_age_history
                 )
-                wait_seconds = (next_slice - get_moscow_datetime()).total_seconds()
-                if wait_seconds <= 0:
-                    wait_seconds = 1
-                log_debug(f"[ONLINE] Ждём {wait_seconds} секунд до следующего среза")
-                await asyncio.sleep(wait_seconds)
-            except asyncio.CancelledError:
-                log_debug("[TASK] save_online_history_task cancelled")
-                break
-            except Exception as e:
-                log_debug(f"[TASK] save_online_history_task error: {e}")
-                await asyncio.sleep(5)
+                players = parse_players_online(xml) if xml else []
+                log_debug(f"[ONLINE] Игроки онлайн: {players}")
+                try:
+                    added = await save_online_slice(bot.db_pool, start_min, players)
+                    log_debug(f"[DB] Добавлено записей: {added}")
+                except Exception as db_e:
+                    log_debug(f"[DB] Ошибка записи среза: {db_e}")
+
+            next_slice = (
+                now.replace(second=0, microsecond=0)
+                + timedelta(minutes=step - (now.minute % step))
+            )
+            wait_seconds = (next_slice - get_moscow_datetime()).total_seconds()
+            if wait_seconds <= 0:
+                wait_seconds = 1
+            log_debug(f"[ONLINE] Ждём {wait_seconds} секунд до следующего среза")
+            await asyncio.sleep(wait_seconds)
+        except asyncio.CancelledError:
+            log_debug("[TASK] save_online_history_task cancelled")
+            break
+        except Exception as e:
+            log_debug(f"[TASK] save_online_history_task error: {e}")
+            await asyncio.sleep(5)
 
 
 async def cleanup_old_online_history_task(bot: discord.Client) -> None:
-    """Удаляет записи старше 30 дней из player_online_history."""
+    """Удаляет секции player_online_history старше 30 дней и создаёт новые."""
     log_debug("[TASK] Запущен cleanup_old_online_history_task")
     await bot.wait_until_ready()
     while not bot.is_closed():
         try:
-            log_debug("[DB] Удаляем старые записи из player_online_history")
+            await ensure_partitions(bot.db_pool)
+            log_debug("[DB] Удаляем старые секции player_online_history")
             cutoff = get_moscow_datetime() - timedelta(days=cleanup_history_days)
-            await bot.db_pool.execute(
-                "DELETE FROM player_online_history WHERE check_time < $1",
-                cutoff,
-            )
+            dropped = await drop_expired_partitions(bot.db_pool, cutoff)
+            if dropped:
+                log_debug(f"[DB] Удалены секции: {', '.join(dropped)}")
             await asyncio.sleep(cleanup_task_interval_seconds)
         except asyncio.CancelledError:
             log_debug("[TASK] cleanup_old_online_history_task cancelled")
@@ -20,11 +20,12 @@ async def fetch_players(pool: Pool) -> List[Tuple[str, float, datetime]]:
     try:
         rows = await pool.fetch(
             """
-            SELECT player_name AS nickname,
-                   total_hours,
-                   updated_at AS last_seen
-            FROM player_total_time
-            ORDER BY total_hours DESC;
+            SELECT pl.display_name AS nickname,
+                   t.total_hours,
+                   t.updated_at AS last_seen
+            FROM player_total_time t
+            JOIN players pl ON pl.id = t.player_id
+            ORDER BY t.total_hours DESC;
             """
         )
     except Exception as e:
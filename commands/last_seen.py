@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import discord
+from discord import app_commands
+
+from config.config import ONLINE_MONTH_DAYS
+from utils.helpers import get_moscow_datetime
+from utils.logger import log_debug
+from utils.player_sessions import fetch_last_seen, fetch_playtime
+from pause_guard import pause_guard
+
+
+def _format_duration(value: timedelta) -> str:
+    minutes = int(value.total_seconds() // 60)
+    return f"{minutes // 60} ч {minutes % 60} мин"
+
+
+async def _handle_command(interaction: discord.Interaction, nickname: str) -> None:
+    await interaction.response.defer()
+    pool = interaction.client.db_pool
+    now = get_moscow_datetime()
+    try:
+        last_seen = await fetch_last_seen(pool, nickname)
+        playtime = await fetch_playtime(
+            pool,
+            now - timedelta(days=ONLINE_MONTH_DAYS),
+            now,
+            player_name=nickname,
+        )
+    except Exception:
+        await interaction.followup.send("Ошибка при получении данных.", ephemeral=True)
+        return
+
+    if last_seen is None:
+        await interaction.followup.send(f"Игрок {nickname} не найден.")
+        return
+
+    played = playtime[0][1] if playtime else timedelta()
+    name = playtime[0][0] if playtime else nickname
+    await interaction.followup.send(
+        f"\U0001f464 {name}\n"
+        f"Последний раз на сервере: {last_seen.strftime('%d.%m.%Y %H:%M')}\n"
+        f"Время на сервере за {ONLINE_MONTH_DAYS} дней: {_format_duration(played)}"
+    )
+
+
+def setup(tree: app_commands.CommandTree) -> None:
+    @tree.command(name="last_seen", description="Когда игрок был на сервере")
+    @app_commands.describe(nickname="Ник игрока")
+    @pause_guard
+    async def last_seen_command(
+        interaction: discord.Interaction, nickname: str
+    ) -> None:
+        await _handle_command(interaction, nickname)
+
+    log_debug("[Slash] Команда /last_seen зарегистрирована")
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-import os
-
 import discord
 from discord import app_commands
 
-from config.config import ONLINE_MONTH_GRAPH_TITLE
+from datetime import timedelta
+
+from config.config import (
+    ONLINE_MONTH_DAYS,
+    ONLINE_MONTH_GRAPH_FILENAME,
+    ONLINE_MONTH_GRAPH_TITLE,
+)
+from utils.helpers import get_moscow_datetime
 from utils.online_month_graph import generate_online_month_graph
+from utils.player_sessions import fetch_peak_concurrency
 from utils.logger import log_debug
 from pause_guard import pause_guard
 
@@ -20,15 +26,24 @@ def setup(tree: app_commands.CommandTree) -> None:
     async def online_month_command(interaction: discord.Interaction) -> None:
         await interaction.response.defer()
         try:
-            path = await generate_online_month_graph(interaction.client.db_pool)
-            if not path:
+            graph = await generate_online_month_graph(interaction.client.db_pool)
+            if not graph:
                 await interaction.followup.send("Нет данных за последний месяц.")
                 return
-            embed = discord.Embed(title=ONLINE_MONTH_GRAPH_TITLE)
-            embed.set_image(url=f"attachment://{os.path.basename(path)}")
+            now = get_moscow_datetime()
+            peak = await fetch_peak_concurrency(
+                interaction.client.db_pool,
+                now - timedelta(days=ONLINE_MONTH_DAYS),
+                now,
+            )
+            embed = discord.Embed(
+                title=ONLINE_MONTH_GRAPH_TITLE,
+                description=f"Пик одновременного онлайна: {peak}",
+            )
+            embed.set_image(url=f"attachment://{ONLINE_MONTH_GRAPH_FILENAME}")
             await interaction.followup.send(
                 embed=embed,
-                file=discord.File(path, filename=os.path.basename(path)),
+                file=discord.File(graph, filename=ONLINE_MONTH_GRAPH_FILENAME),
             )
         except Exception as e:
             log_debug(f"[CMD] online_month error: {e}")
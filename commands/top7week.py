@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 import discord
 from discord import app_commands
 
@@ -10,11 +12,23 @@ from pause_guard import pause_guard
 
 def setup(tree: app_commands.CommandTree) -> None:
     @tree.command(name="top7week", description="Топ 7 игроков за неделю по часам")
+    @app_commands.describe(
+        weeks_ago="Сколько недель назад (0 — текущая неделя)",
+        compare="С какой неделей сравнить (сколько недель назад)",
+    )
     @pause_guard
-    async def top7week_command(interaction: discord.Interaction) -> None:
+    async def top7week_command(
+        interaction: discord.Interaction,
+        weeks_ago: app_commands.Range[int, 0, 520] = 0,
+        compare: Optional[app_commands.Range[int, 0, 520]] = None,
+    ) -> None:
         await interaction.response.defer()
         try:
-            text = await generate_weekly_top(interaction.client.db_pool)
+            text = await generate_weekly_top(
+                interaction.client.db_pool,
+                weeks_ago=weeks_ago,
+                compare_weeks_ago=compare,
+            )
             await interaction.followup.send(text)
         except Exception as e:
             log_debug(f"[CMD] top7week error: {e}")
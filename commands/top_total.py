@@ -21,10 +21,11 @@ async def _fetch_top_total(
     try:
         rows = await pool.fetch(
             f"""
-            SELECT player_name, total_hours,
+            SELECT pl.display_name AS player_name, t.total_hours,
                    COUNT(*) OVER () AS total_count
-            FROM {table_name}
-            ORDER BY total_hours DESC, player_name
+            FROM {table_name} t
+            JOIN players pl ON pl.id = t.player_id
+            ORDER BY t.total_hours DESC, pl.display_name
             LIMIT $1
             """,
             limit,
@@ -1,7 +1,6 @@
 """Load application configuration from environment variables."""
 
 from dataclasses import dataclass
-from pathlib import Path
 import os
 
 from dotenv import load_dotenv
@@ -24,28 +23,61 @@ class Config:
     api_secret_code: str = os.getenv("API_SECRET_CODE", "")
     api_poll_interval: int = int(os.getenv("API_POLL_INTERVAL", 900))
     ftp_poll_interval: int = int(os.getenv("FTP_POLL_INTERVAL", 1800))
+    ftp_poll_active_interval: int = int(os.getenv("FTP_POLL_ACTIVE_INTERVAL", 300))
+    ftp_poll_max_interval: int = int(os.getenv("FTP_POLL_MAX_INTERVAL", 3600))
+    ftp_poll_jitter: float = float(os.getenv("FTP_POLL_JITTER", 0.1))
     ftp_host: str = os.getenv("FTP_HOST", "")
     ftp_port: int = int(os.getenv("FTP_PORT", 21))
     ftp_user: str = os.getenv("FTP_USER", "")
     ftp_pass: str = os.getenv("FTP_PASS", "")
+    ftp_pool_size: int = int(os.getenv("FTP_POOL_SIZE", 2))
+    # Простаивающие сессии держатся дольше самого длинного интервала опроса,
+    # а keepalive шлёт им NOOP, чтобы сервер не закрыл их по своему таймауту
+    ftp_idle_timeout: int = int(os.getenv("FTP_IDLE_TIMEOUT", 3900))
+    ftp_keepalive_interval: int = int(os.getenv("FTP_KEEPALIVE_INTERVAL", 120))
+    ftp_reconnect_backoff_max: int = int(os.getenv("FTP_RECONNECT_BACKOFF_MAX", 300))
     postgres_url: str = os.getenv("POSTGRES_URL", "")
 
     ftp_profile_dir: str = os.getenv("FTP_PROFILE_DIR", "1377415")
     ftp_savegame_dir: str = os.getenv("FTP_SAVEGAME_DIR", "config/savegame2")
     timezone_offset: int = int(os.getenv("TIMEZONE_OFFSET", 3))
-    output_dir: Path = Path(os.getenv("OUTPUT_DIR", "output"))
 
     http_timeout: int = int(os.getenv("HTTP_TIMEOUT", 10))
+    http_pool_limit: int = int(os.getenv("HTTP_POOL_LIMIT", 20))
+    http_pool_limit_per_host: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 4))
+    http_dns_cache_ttl: int = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+    http_keepalive_timeout: int = int(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+    fetch_source_timeout: int = int(os.getenv("FETCH_SOURCE_TIMEOUT", 30))
+    stats_max_age_embed: int = int(os.getenv("STATS_MAX_AGE_EMBED", 120))
+    stats_max_age_history: int = int(os.getenv("STATS_MAX_AGE_HISTORY", 30))
     online_slice_minutes: int = int(os.getenv("ONLINE_HISTORY_SLICE_MINUTES", 15))
+    history_archive_dir: str = os.getenv("HISTORY_ARCHIVE_DIR", "history_archive")
     total_time_interval: int = int(os.getenv("TOTAL_TIME_INTERVAL_SECONDS", 3600))
     message_cleanup_limit: int = int(os.getenv("DISCORD_MESSAGE_CLEANUP_LIMIT", 20))
+    status_max_age: int = int(os.getenv("STATUS_MAX_AGE", 3600))
+    status_message_edit: bool = os.getenv("STATUS_MESSAGE_EDIT", "true").lower() in {
+        "true",
+        "1",
+        "yes",
+    }
+    graph_renderer: str = os.getenv("GRAPH_RENDERER", "matplotlib").lower()
+    graph_font_path: str = os.getenv("GRAPH_FONT_PATH", "")
+    worker_pool_kind: str = os.getenv("WORKER_POOL_KIND", "thread").lower()
+    worker_pool_size: int = int(os.getenv("WORKER_POOL_SIZE", 2))
 
 
 config = Config()
 
+# Час засчитывается игроку, если он был хотя бы в стольких срезах за час
+ACTIVE_HOUR_MIN_SLICES = 3
+
 # Cleanup settings
 cleanup_history_days = 30
 cleanup_task_interval_seconds = 86400
+# Сколько дней хранить почасовую сводку; дневные итоги хранятся бессрочно
+HOURLY_RETENTION_DAYS = 365
+# На сколько дней вперёд заранее создавать секции player_online_history
+HISTORY_PARTITION_DAYS_AHEAD = 7
 
 # Graph settings
 ONLINE_MONTH_DAYS = 30
@@ -53,9 +85,8 @@ ONLINE_MONTH_GRAPH_FILENAME = "online_month_graph.png"
 ONLINE_DAILY_GRAPH_FILENAME = "online_daily_graph.png"
 ONLINE_MONTH_GRAPH_TITLE = "Онлайн по дням (последние 30 дней)"
 ONLINE_DAILY_GRAPH_TITLE = "Количество игроков по часам (сегодня)"
-
-ONLINE_MONTH_GRAPH_PATH = config.output_dir / ONLINE_MONTH_GRAPH_FILENAME
-ONLINE_DAILY_GRAPH_PATH = config.output_dir / ONLINE_DAILY_GRAPH_FILENAME
+# Сколько PNG-графиков держать в памяти
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", 16))
 
 # Weekly top settings
 WEEKLY_TOP_LIMIT = int(os.getenv("WEEKLY_TOP_LIMIT", 7))
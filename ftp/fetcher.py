@@ -1,6 +1,9 @@
 """Utility for fetching files via FTP."""
 
-from typing import Optional
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple, Optional
 
 import aioftp
 
@@ -8,66 +11,206 @@ from config.config import config
 from utils.logger import log_debug
 
 
-async def fetch_file(file_name: str) -> Optional[str]:
-    """Download a file from the configured FTP server."""
-    log_debug(
-        f"[FTP] Connecting to {config.ftp_host}:{config.ftp_port} as {config.ftp_user}"
-    )
-    try:
-        async with aioftp.Client.context(
-            config.ftp_host,
-            config.ftp_port,
-            user=config.ftp_user,
-            password=config.ftp_pass,
-        ) as ftp_client:
+class FtpSessionPool:
+    """Long-lived FTP connections already parked in the savegame directory.
+
+    Connections are checked with ``NOOP`` before reuse, dropped after
+    ``idle_timeout`` seconds of inactivity and re-established with an
+    exponential backoff when the server refuses to log us in. While
+    connections are parked, a keepalive sends them ``NOOP`` every
+    ``keepalive_interval`` seconds so the server's own idle timeout does not
+    close them between polls.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int = config.ftp_pool_size,
+        idle_timeout: float = config.ftp_idle_timeout,
+        backoff_base: float = 5.0,
+        backoff_max: float = config.ftp_reconnect_backoff_max,
+        keepalive_interval: float = config.ftp_keepalive_interval,
+    ) -> None:
+        self._idle: list[tuple[aioftp.Client, float]] = []
+        self._keepalive_interval = keepalive_interval
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(max_sessions)
+        self._idle_timeout = idle_timeout
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._failures = 0
+        self._retry_at = 0.0
+
+    async def _connect(self) -> aioftp.Client:
+        """Open a new connection, log in and enter the savegame directory."""
+        wait = self._retry_at - time.monotonic()
+        if wait > 0:
+            raise ConnectionError(f"reconnect backoff, next attempt in {wait:.0f}s")
+
+        log_debug(
+            f"[FTP] Connecting to {config.ftp_host}:{config.ftp_port} as {config.ftp_user}"
+        )
+        client = aioftp.Client()
+        try:
+            await client.connect(config.ftp_host, config.ftp_port)
+            await client.login(config.ftp_user, config.ftp_pass)
             log_debug(f"[FTP] Entering {config.ftp_profile_dir}...")
-            await ftp_client.change_directory(config.ftp_profile_dir)
+            await client.change_directory(config.ftp_profile_dir)
             log_debug(f"[FTP] Entering {config.ftp_savegame_dir}...")
-            await ftp_client.change_directory(config.ftp_savegame_dir)
-            log_debug(f"[FTP] Downloading file: {file_name}")
-            async with ftp_client.download_stream(file_name) as stream:
-                content = await stream.read()
-                log_debug(
-                    f"[FTP] File {file_name} downloaded. Size: {len(content)} bytes"
-                )
-                return content.decode("utf-8")
+            await client.change_directory(config.ftp_savegame_dir)
+        except BaseException:
+            client.close()
+            self._failures += 1
+            delay = min(
+                self._backoff_base * 2 ** (self._failures - 1), self._backoff_max
+            )
+            self._retry_at = time.monotonic() + delay
+            log_debug(f"[FTP] Connection failed, next attempt in {delay:.0f}s")
+            raise
+
+        self._failures = 0
+        self._retry_at = 0.0
+        return client
+
+    @staticmethod
+    async def _is_alive(client: aioftp.Client) -> bool:
+        """Check that the control connection still answers ``NOOP``."""
+        try:
+            await client.command("NOOP", "2xx")
+            return True
+        except Exception:
+            return False
+
+    async def _checkout(self) -> aioftp.Client:
+        """Return a live idle connection or open a new one."""
+        while self._idle:
+            client, parked_at = self._idle.pop()
+            if time.monotonic() - parked_at > self._idle_timeout:
+                client.close()
+                continue
+            if await self._is_alive(client):
+                log_debug("[FTP] Reusing pooled connection")
+                return client
+            log_debug("[FTP] Pooled connection is dead, dropping it")
+            client.close()
+        return await self._connect()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[aioftp.Client]:
+        """Borrow a logged-in connection for the duration of the block."""
+        async with self._semaphore:
+            client = await self._checkout()
+            try:
+                yield client
+            except BaseException:
+                client.close()
+                raise
+            self._idle.append((client, time.monotonic()))
+            self._start_keepalive()
+
+    def _start_keepalive(self) -> None:
+        if self._keepalive_interval <= 0:
+            return
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def _keepalive(self) -> None:
+        """Ping parked connections until none are left."""
+        while self._idle:
+            await asyncio.sleep(self._keepalive_interval)
+            for entry in list(self._idle):
+                if entry not in self._idle:
+                    continue  # borrowed meanwhile
+                client, parked_at = entry
+                # Take the connection out while pinging so it is not borrowed
+                self._idle.remove(entry)
+                if time.monotonic() - parked_at > self._idle_timeout:
+                    client.close()
+                elif await self._is_alive(client):
+                    self._idle.append(entry)
+                else:
+                    log_debug("[FTP] Keepalive failed, dropping pooled connection")
+                    client.close()
+
+    async def close(self) -> None:
+        """Log out and close all idle connections."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        while self._idle:
+            client, _ = self._idle.pop()
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+
+ftp_pool = FtpSessionPool()
+
+
+class FtpFile(NamedTuple):
+    """Content of a savegame file and whether it changed since last fetch."""
+
+    content: Optional[bytes]
+    modified: bool
+
+
+# file name -> ((MDTM, SIZE), raw content)
+_file_cache: dict[str, tuple[tuple[str, str], bytes]] = {}
+
+
+async def _file_metadata(
+    ftp_client: aioftp.Client, file_name: str
+) -> Optional[tuple[str, str]]:
+    """Return ``(MDTM, SIZE)`` of ``file_name`` or ``None`` if unsupported."""
+    try:
+        _, mdtm = await ftp_client.command(f"MDTM {file_name}", "213")
+        _, size = await ftp_client.command(f"SIZE {file_name}", "213")
     except Exception as e:
-        log_debug(f"[FTP] ❌ Error downloading file '{file_name}': {e}")
+        log_debug(f"[FTP] MDTM/SIZE unavailable for '{file_name}': {e}")
         return None
+    return "".join(mdtm).strip(), "".join(size).strip()
 
 
-async def fetch_files(*file_names: str) -> list[Optional[str]]:
-    """Download multiple files during a single FTP session."""
-    log_debug(
-        f"[FTP] Connecting to {config.ftp_host}:{config.ftp_port} as {config.ftp_user}"
-    )
-    results: list[Optional[str]] = []
-    try:
-        async with aioftp.Client.context(
-            config.ftp_host,
-            config.ftp_port,
-            user=config.ftp_user,
-            password=config.ftp_pass,
-        ) as ftp_client:
-            log_debug(f"[FTP] Entering {config.ftp_profile_dir}...")
-            await ftp_client.change_directory(config.ftp_profile_dir)
-            log_debug(f"[FTP] Entering {config.ftp_savegame_dir}...")
-            await ftp_client.change_directory(config.ftp_savegame_dir)
+async def _download(ftp_client: aioftp.Client, file_name: str) -> bytes:
+    """Download ``file_name`` from the current directory as raw bytes.
+
+    The bytes are handed to the XML parser as is, without building an
+    intermediate ``str`` copy.
+    """
+    log_debug(f"[FTP] Downloading file: {file_name}")
+    async with ftp_client.download_stream(file_name) as stream:
+        content = await stream.read()
+        log_debug(f"[FTP] File {file_name} downloaded. Size: {len(content)} bytes")
+        return content
 
+
+async def fetch_files_if_modified(*file_names: str) -> list[FtpFile]:
+    """Download only files whose MDTM/SIZE changed since the previous call.
+
+    Unchanged files are returned from the in-memory cache with
+    ``modified=False`` so later stages can skip parsing them.
+    """
+    results: list[FtpFile] = []
+    try:
+        async with ftp_pool.session() as ftp_client:
             for fname in file_names:
                 try:
-                    log_debug(f"[FTP] Downloading file: {fname}")
-                    async with ftp_client.download_stream(fname) as stream:
-                        content = await stream.read()
-                        log_debug(
-                            f"[FTP] File {fname} downloaded. Size: {len(content)} bytes"
-                        )
-                        results.append(content.decode("utf-8"))
+                    meta = await _file_metadata(ftp_client, fname)
+                    cached = _file_cache.get(fname)
+                    if meta is not None and cached is not None and cached[0] == meta:
+                        log_debug(f"[FTP] File {fname} not modified, using cache")
+                        results.append(FtpFile(cached[1], False))
+                        continue
+                    content = await _download(ftp_client, fname)
+                    if meta is not None:
+                        _file_cache[fname] = (meta, content)
+                    results.append(FtpFile(content, True))
                 except Exception as e:
                     log_debug(f"[FTP] ❌ Error downloading file '{fname}': {e}")
-                    results.append(None)
+                    results.append(FtpFile(None, True))
     except Exception as e:
         log_debug(f"[FTP] ❌ Error connecting to FTP: {e}")
-        results = [None for _ in file_names]
+        results = [FtpFile(None, True) for _ in file_names]
 
     return results
@@ -12,15 +12,25 @@ from bot.updater import (
     save_online_history_task,
     cleanup_old_online_history_task,
 )
+from utils.history_partitions import ensure_partitions, migrate_history_to_partitions
+from utils.history_retention import history_compaction_task
+from utils.online_history import backfill_daily_presence, backfill_hourly_presence
+from utils.player_sessions import backfill_sessions
+from utils.players import migrate_player_ids
 from utils.total_time_updater import total_time_update_task
-from utils.weekly_archiver import weekly_top_archive_task
+from utils.weekly_archiver import seed_weekly_top_history, weekly_top_archive_task
+from utils.weekly_top import weekly_leaderboard
 from bot.discord_ui import build_paused_embed
+from bot.http_client import create_http_session
+from ftp.fetcher import ftp_pool
+from utils.worker_pool import worker_pool
 
 from utils.logger import log_debug, log_info
 from commands.top7lastweek import setup as setup_top7lastweek
 from commands.top7week import setup as setup_top7week
 from commands.top_total import setup as setup_top_total
 from commands.online_month import setup as setup_online_month
+from commands.last_seen import setup as setup_last_seen
 from commands.export_excel import setup as setup_export_excel
 from commands.info import setup as setup_info
 from commands.clear_bot_messages import setup as setup_clear_bot_messages
@@ -42,13 +52,116 @@ class MyBot(discord.Client):
         self.tree = app_commands.CommandTree(self)
         self.tasks: list[asyncio.Task] = []
         self.db_pool = None
+        self.http_session = None
+
+    async def _ensure_tables(self) -> None:
+        """Create tables that may be missing from older databases."""
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS players (
+                id SERIAL PRIMARY KEY,
+                canonical_name TEXT UNIQUE NOT NULL,
+                display_name TEXT NOT NULL
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS player_total_time (
+                player_id INTEGER PRIMARY KEY REFERENCES players (id),
+                total_hours INTEGER NOT NULL DEFAULT 0,
+                last_processed_at TIMESTAMP NOT NULL DEFAULT '2000-01-01 00:00:00',
+                updated_at TIMESTAMP NOT NULL
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bot_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS player_hourly_presence (
+                player_id INTEGER NOT NULL REFERENCES players (id),
+                hour_start TIMESTAMP NOT NULL,
+                slices INTEGER NOT NULL,
+                active BOOLEAN NOT NULL,
+                PRIMARY KEY (player_id, hour_start)
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS player_daily_presence (
+                day DATE NOT NULL,
+                player_id INTEGER NOT NULL REFERENCES players (id),
+                PRIMARY KEY (day, player_id)
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS player_sessions (
+                id BIGSERIAL PRIMARY KEY,
+                player_id INTEGER NOT NULL REFERENCES players (id),
+                started_at TIMESTAMP NOT NULL,
+                ended_at TIMESTAMP NOT NULL,
+                slices INTEGER NOT NULL
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS player_daily_totals (
+                day DATE NOT NULL,
+                player_id INTEGER NOT NULL REFERENCES players (id),
+                slices INTEGER NOT NULL,
+                active_hours INTEGER NOT NULL,
+                PRIMARY KEY (day, player_id)
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS weekly_leaderboard (
+                week_start TIMESTAMP NOT NULL,
+                player_id INTEGER NOT NULL REFERENCES players (id),
+                hours INTEGER NOT NULL,
+                PRIMARY KEY (week_start, player_id)
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS weekly_top_history (
+                week_start TIMESTAMP NOT NULL,
+                player_id INTEGER NOT NULL REFERENCES players (id),
+                player_name TEXT NOT NULL,
+                hours INTEGER NOT NULL,
+                PRIMARY KEY (week_start, player_id)
+            )
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_online_stats (
+                day DATE PRIMARY KEY,
+                unique_players INTEGER NOT NULL
+            )
+            """
+        )
 
     async def _ensure_indexes(self) -> None:
         """Create required database indexes if they do not exist."""
         await self.db_pool.execute(
             """
-            CREATE INDEX IF NOT EXISTS idx_online_name_date_hour
-            ON player_online_history (player_name, date, hour)
+            CREATE INDEX IF NOT EXISTS idx_online_player_date_hour
+            ON player_online_history (player_id, date, hour)
             """
         )
         await self.db_pool.execute(
@@ -57,6 +170,30 @@ class MyBot(discord.Client):
             ON player_online_history (check_time)
             """
         )
+        await self.db_pool.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_online_slice_player
+            ON player_online_history (check_time, player_id)
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_hourly_active_hour
+            ON player_hourly_presence (hour_start) WHERE active
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_sessions_player_end
+            ON player_sessions (player_id, ended_at)
+            """
+        )
+        await self.db_pool.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_sessions_end
+            ON player_sessions (ended_at)
+            """
+        )
         await self.db_pool.execute(
             """
             CREATE INDEX IF NOT EXISTS idx_total_hours
@@ -70,6 +207,10 @@ class MyBot(discord.Client):
             task.cancel()
         if self.tasks:
             await asyncio.gather(*self.tasks, return_exceptions=True)
+        await ftp_pool.close()
+        if self.http_session:
+            await self.http_session.close()
+        worker_pool.shutdown()
         if self.db_pool:
             await self.db_pool.close()
         await super().close()
@@ -78,7 +219,17 @@ class MyBot(discord.Client):
         """Called by discord.py when the client is ready."""
         log_info("[SETUP] Starting bot setup")
         self.db_pool = await asyncpg.create_pool(dsn=config.postgres_url)
+        self.http_session = create_http_session()
+        await self._ensure_tables()
+        await migrate_player_ids(self.db_pool)
+        await migrate_history_to_partitions(self.db_pool)
+        await ensure_partitions(self.db_pool)
         await self._ensure_indexes()
+        await backfill_hourly_presence(self.db_pool)
+        await backfill_daily_presence(self.db_pool)
+        await backfill_sessions(self.db_pool)
+        await weekly_leaderboard.load(self.db_pool)
+        await seed_weekly_top_history(self.db_pool)
         if config.bot_paused_mode:
             log_info("[SETUP] BOT_PAUSED_MODE enabled - skipping background tasks")
             channel = await self.fetch_channel(config.channel_id)
@@ -127,6 +278,10 @@ class MyBot(discord.Client):
             task.add_done_callback(handle_task_exception)
             self.tasks.append(task)
 
+            task = asyncio.create_task(history_compaction_task(self))
+            task.add_done_callback(handle_task_exception)
+            self.tasks.append(task)
+
             task = asyncio.create_task(weekly_top_archive_task(self))
             task.add_done_callback(handle_task_exception)
             self.tasks.append(task)
@@ -138,6 +293,7 @@ class MyBot(discord.Client):
 
         setup_top_total(self.tree)
         setup_online_month(self.tree)
+        setup_last_seen(self.tree)
         setup_info(self.tree)
         setup_clear_bot_messages(self.tree)
         await setup_export_excel(self.tree)
@@ -1,19 +1,51 @@
-CREATE TABLE IF NOT EXISTS player_online_history (
+-- Справочник игроков; canonical_name — ник без учёта регистра
+CREATE TABLE IF NOT EXISTS players (
     id SERIAL PRIMARY KEY,
-    player_name TEXT NOT NULL,
+    canonical_name TEXT UNIQUE NOT NULL,
+    display_name TEXT NOT NULL
+);
+
+-- Секции по дням (player_online_history_pYYYYMMDD) бот создаёт заранее,
+-- старые секции отсоединяются и удаляются целиком
+CREATE TABLE IF NOT EXISTS player_online_history (
+    player_id INTEGER NOT NULL,
     check_time TIMESTAMP NOT NULL,
     date DATE NOT NULL,
     hour INTEGER NOT NULL,
     dow INTEGER NOT NULL
-);
+) PARTITION BY RANGE (check_time);
+-- Строки вне созданных секций
+CREATE TABLE IF NOT EXISTS player_online_history_default PARTITION OF player_online_history DEFAULT;
 
-CREATE INDEX IF NOT EXISTS idx_online_name_date_hour ON player_online_history (player_name, date, hour);
+CREATE INDEX IF NOT EXISTS idx_online_player_date_hour ON player_online_history (player_id, date, hour);
 -- Ускоряем выборки по времени
 CREATE INDEX IF NOT EXISTS idx_online_check_time ON player_online_history (check_time);
+-- check_time — начало среза; игрок попадает в срез не больше одного раза
+CREATE UNIQUE INDEX IF NOT EXISTS uq_online_slice_player ON player_online_history (check_time, player_id);
+
+-- Почасовая сводка: сколько срезов игрок провёл в каждом часе и засчитан ли час
+CREATE TABLE IF NOT EXISTS player_hourly_presence (
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    hour_start TIMESTAMP NOT NULL,
+    slices INTEGER NOT NULL,
+    active BOOLEAN NOT NULL,
+    PRIMARY KEY (player_id, hour_start)
+);
+CREATE INDEX IF NOT EXISTS idx_hourly_active_hour ON player_hourly_presence (hour_start) WHERE active;
+
+-- Игроки, заходившие в каждый день, и число уникальных игроков за день
+CREATE TABLE IF NOT EXISTS player_daily_presence (
+    day DATE NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    PRIMARY KEY (day, player_id)
+);
+CREATE TABLE IF NOT EXISTS daily_online_stats (
+    day DATE PRIMARY KEY,
+    unique_players INTEGER NOT NULL
+);
 
 CREATE TABLE IF NOT EXISTS player_total_time (
-    id SERIAL PRIMARY KEY,
-    player_name TEXT UNIQUE NOT NULL,
+    player_id INTEGER PRIMARY KEY REFERENCES players (id),
     total_hours INTEGER NOT NULL DEFAULT 0,
     last_processed_at TIMESTAMP NOT NULL DEFAULT '2000-01-01 00:00:00',
     updated_at TIMESTAMP NOT NULL
@@ -21,7 +53,52 @@ CREATE TABLE IF NOT EXISTS player_total_time (
 -- Индекс для сортировки по общему времени
 CREATE INDEX IF NOT EXISTS idx_total_hours ON player_total_time (total_hours DESC);
 
+-- Сессии: непрерывные интервалы присутствия игрока по подряд идущим срезам
+CREATE TABLE IF NOT EXISTS player_sessions (
+    id BIGSERIAL PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP NOT NULL,
+    slices INTEGER NOT NULL
+);
+-- Поиск продолжаемой сессии и выборки по периоду
+CREATE INDEX IF NOT EXISTS idx_sessions_player_end ON player_sessions (player_id, ended_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_end ON player_sessions (ended_at);
+
+-- Дневные итоги игроков; хранятся бессрочно, почасовая сводка — год
+CREATE TABLE IF NOT EXISTS player_daily_totals (
+    day DATE NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    slices INTEGER NOT NULL,
+    active_hours INTEGER NOT NULL,
+    PRIMARY KEY (day, player_id)
+);
+
+-- Часы игроков по неделям; текущая неделя держится и в памяти бота
+CREATE TABLE IF NOT EXISTS weekly_leaderboard (
+    week_start TIMESTAMP NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    hours INTEGER NOT NULL,
+    PRIMARY KEY (week_start, player_id)
+);
+
+-- Архив таблиц лидеров всех прошедших недель; строки только добавляются
+CREATE TABLE IF NOT EXISTS weekly_top_history (
+    week_start TIMESTAMP NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    player_name TEXT NOT NULL,
+    hours INTEGER NOT NULL,
+    PRIMARY KEY (week_start, player_id)
+);
+
 CREATE TABLE IF NOT EXISTS weekly_top_last (
     player_name TEXT PRIMARY KEY,
     hours INTEGER NOT NULL
 );
+
+-- Служебные значения бота (id сообщения со статусом и т.п.)
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
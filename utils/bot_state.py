@@ -0,0 +1,32 @@
+"""Хранение служебных значений бота в таблице bot_state."""
+
+from __future__ import annotations
+
+from typing import Optional
+
+BOT_STATE_TABLE = "bot_state"
+
+
+async def get_state(db, key: str) -> Optional[str]:
+    """Возвращает значение ``key`` или ``None``, если оно не сохранено.
+
+    ``db`` — пул или соединение asyncpg.
+    """
+    return await db.fetchval(
+        f"SELECT value FROM {BOT_STATE_TABLE} WHERE key = $1",
+        key,
+    )
+
+
+async def set_state(db, key: str, value: str) -> None:
+    """Сохраняет ``value`` под ключом ``key``."""
+    await db.execute(
+        f"""
+        INSERT INTO {BOT_STATE_TABLE} (key, value, updated_at)
+        VALUES ($1, $2, NOW())
+        ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value, updated_at = NOW()
+        """,
+        key,
+        value,
+    )
@@ -0,0 +1,77 @@
+"""Кеш отрисованных графиков в памяти."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from config.config import GRAPH_CACHE_SIZE
+from utils.logger import log_debug
+from utils.worker_pool import worker_pool
+
+
+class GraphCache:
+    """LRU-кеш PNG-байтов, ключ — хеш входного ряда и параметров отрисовки.
+
+    Одинаковые данные отрисовываются один раз; параллельные запросы одного
+    и того же графика ждут единственную отрисовку.
+    """
+
+    def __init__(self, max_entries: int = GRAPH_CACHE_SIZE) -> None:
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._max_entries = max_entries
+
+    @staticmethod
+    def make_key(kind: str, *params: Any) -> str:
+        """Ключ кеша для графика ``kind`` с параметрами ``params``."""
+        return hashlib.sha256(repr((kind, params)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        png = self._entries.get(key)
+        if png is not None:
+            self._entries.move_to_end(key)
+        return png
+
+    def put(self, key: str, png: bytes) -> None:
+        self._entries[key] = png
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def render(
+        self, kind: str, render: Callable[..., bytes], *args: Any
+    ) -> io.BytesIO:
+        """Возвращает PNG из кеша или отрисовывает его в пуле исполнителей."""
+        key = self.make_key(kind, *args)
+        png = self.get(key)
+        if png is not None:
+            log_debug(f"[GRAPH] {kind}: взят из кеша")
+            return io.BytesIO(png)
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(worker_pool.run(kind, render, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, kind, f))
+        else:
+            log_debug(f"[GRAPH] {kind}: ждём начатую отрисовку")
+        png = await asyncio.shield(future)
+        return io.BytesIO(png)
+
+    def _finish(self, key: str, kind: str, future: asyncio.Future) -> None:
+        """Сохраняет результат отрисовки, даже если все ожидавшие отменены."""
+        self._inflight.pop(key, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            log_debug(f"[GRAPH] {kind}: ошибка отрисовки: {error}")
+            return
+        self.put(key, future.result())
+
+
+graph_cache = GraphCache()
@@ -0,0 +1,229 @@
+"""Отрисовка столбчатых диаграмм разными движками.
+
+Движок выбирается переменной ``GRAPH_RENDERER``:
+
+* ``matplotlib`` — прежний вариант, тяжёлый импорт и заметный расход памяти;
+* ``pillow`` — собственный простой рендерер столбчатой диаграммы на Pillow.
+
+Оба движка возвращают PNG в виде байтов, модули графиков от выбора не зависят.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import io
+import math
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from config.config import config
+
+BAR_COLOR = "#1f77b4"  # tab:blue
+DPI = 100
+
+
+def _render_matplotlib(
+    labels: Sequence[str],
+    counts: Sequence[int],
+    *,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    size: Tuple[float, float],
+    rotate_labels: bool,
+) -> bytes:
+    # Импорт внутри функции: matplotlib грузится, только если выбран этот движок
+    from matplotlib.figure import Figure
+
+    # Figure без pyplot: нет глобального состояния, можно рисовать в потоках
+    fig = Figure(figsize=size, dpi=DPI)
+    ax = fig.add_subplot()
+    ax.bar(range(len(counts)), counts, color=BAR_COLOR)
+
+    if rotate_labels:
+        ax.set_xticks(range(len(labels)), labels=labels, rotation=45, ha="right")
+    else:
+        ax.set_xticks(range(len(labels)), labels=labels)
+    ax.set_xlim(-0.5, len(labels) - 0.5)
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+
+    max_val = max(counts) if counts else 0
+    tick_count = max(max_val + 1, 6)
+    ax.set_yticks(range(tick_count))
+
+    ax.grid(axis="y", linestyle="--", alpha=0.5)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=4)
+def _load_font(size: int):
+    """Шрифт с кириллицей: GRAPH_FONT_PATH, DejaVuSans или встроенный."""
+    from PIL import ImageFont
+
+    candidates: List[str] = []
+    if config.graph_font_path:
+        candidates.append(config.graph_font_path)
+    # DejaVuSans поставляется вместе с matplotlib; ищем файл без импорта пакета
+    spec = importlib.util.find_spec("matplotlib")
+    if spec is not None and spec.submodule_search_locations:
+        candidates.append(
+            os.path.join(
+                spec.submodule_search_locations[0],
+                "mpl-data",
+                "fonts",
+                "ttf",
+                "DejaVuSans.ttf",
+            )
+        )
+    candidates.append("DejaVuSans.ttf")
+    for path in candidates:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _render_pillow(
+    labels: Sequence[str],
+    counts: Sequence[int],
+    *,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    size: Tuple[float, float],
+    rotate_labels: bool,
+) -> bytes:
+    from PIL import Image, ImageDraw
+
+    width, height = int(size[0] * DPI), int(size[1] * DPI)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    font = _load_font(12)
+    title_font = _load_font(14)
+
+    def text_size(text: str, text_font) -> Tuple[int, int]:
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=text_font)
+        return right - left, bottom - top
+
+    max_val = max(counts) if counts else 0
+    tick_count = max(max_val + 1, 6)
+    y_max = tick_count - 1
+    y_labels = [str(v) for v in range(tick_count)]
+    y_label_width = max(text_size(v, font)[0] for v in y_labels)
+    x_label_size = max((text_size(v, font) for v in labels), default=(0, 0))
+    x_label_height = (
+        int((x_label_size[0] + x_label_size[1]) * math.sqrt(0.5)) + 2
+        if rotate_labels
+        else x_label_size[1]
+    )
+
+    title_w, title_h = text_size(title, title_font)
+    xlabel_w, xlabel_h = text_size(xlabel, font)
+    ylabel_w, ylabel_h = text_size(ylabel, font)
+
+    left = 10 + ylabel_h + 8 + y_label_width + 8
+    right = width - 15
+    top = 10 + title_h + 12
+    bottom = height - (10 + xlabel_h + 6 + x_label_height + 6)
+    plot_h = bottom - top
+    slot = (right - left) / max(len(counts), 1)
+
+    def y_to_px(value: float) -> float:
+        return bottom - plot_h * value / max(y_max, 1)
+
+    # Сетка и подписи оси Y; при большом числе делений подписываем не все
+    label_step = max(1, math.ceil(tick_count / 12))
+    for value in range(0, tick_count, label_step):
+        y = y_to_px(value)
+        for x in range(left, right, 8):
+            draw.line([(x, y), (min(x + 4, right), y)], fill="#c8c8c8")
+        label_w, label_h = text_size(y_labels[value], font)
+        draw.text(
+            (left - 6 - label_w, y - label_h / 2 - 2),
+            y_labels[value],
+            fill="black",
+            font=font,
+        )
+
+    for idx, value in enumerate(counts):
+        x0 = left + slot * (idx + 0.1)
+        x1 = left + slot * (idx + 0.9)
+        if value > 0:
+            draw.rectangle([(x0, y_to_px(value)), (x1, bottom)], fill=BAR_COLOR)
+
+    draw.rectangle([(left, top), (right, bottom)], outline="black")
+
+    for idx, label in enumerate(labels):
+        center = left + slot * (idx + 0.5)
+        label_w, label_h = text_size(label, font)
+        if rotate_labels:
+            tile = Image.new("RGBA", (label_w + 4, label_h + 6), (255, 255, 255, 0))
+            ImageDraw.Draw(tile).text((2, 0), label, fill="black", font=font)
+            tile = tile.rotate(45, expand=True)
+            # Правый верхний угол повёрнутой подписи — под делением оси
+            image.paste(tile, (int(center - tile.width), bottom + 4), tile)
+        else:
+            draw.text((center - label_w / 2, bottom + 4), label, fill="black", font=font)
+
+    draw.text(((width - title_w) / 2, 10), title, fill="black", font=title_font)
+    draw.text(
+        (left + (right - left - xlabel_w) / 2, height - 10 - xlabel_h - 2),
+        xlabel,
+        fill="black",
+        font=font,
+    )
+    ylabel_tile = Image.new("RGBA", (ylabel_w + 4, ylabel_h + 6), (255, 255, 255, 0))
+    ImageDraw.Draw(ylabel_tile).text((2, 0), ylabel, fill="black", font=font)
+    ylabel_tile = ylabel_tile.rotate(90, expand=True)
+    image.paste(
+        ylabel_tile,
+        (10, int(top + (plot_h - ylabel_tile.height) / 2)),
+        ylabel_tile,
+    )
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+RENDERERS: Dict[str, Callable[..., bytes]] = {
+    "matplotlib": _render_matplotlib,
+    "pillow": _render_pillow,
+}
+
+
+def render_bar_chart(
+    labels: Sequence[str],
+    counts: Sequence[int],
+    *,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    size: Tuple[float, float],
+    rotate_labels: bool = False,
+    renderer: str | None = None,
+) -> bytes:
+    """Отрисовывает столбчатую диаграмму выбранным движком и возвращает PNG."""
+    name = renderer or config.graph_renderer
+    try:
+        backend = RENDERERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown graph renderer: {name}") from None
+    return backend(
+        labels,
+        counts,
+        title=title,
+        xlabel=xlabel,
+        ylabel=ylabel,
+        size=size,
+        rotate_labels=rotate_labels,
+    )
@@ -0,0 +1,145 @@
+"""Архив сырых срезов онлайна в сжатых CSV-файлах.
+
+Перед удалением дневной секции ``player_online_history`` её строки вместе
+с именами игроков выгружаются в ``HISTORY_ARCHIVE_DIR`` — один файл
+``online_history_ГГГГ-ММ-ДД.csv.gz`` на день.
+
+Чтение архива для разовых выборок::
+
+    python -m utils.history_archive history_archive --from 2025-01-01 --summary
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import os
+import sys
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+ARCHIVE_PREFIX = "online_history_"
+ARCHIVE_SUFFIX = ".csv.gz"
+ARCHIVE_COLUMNS = ("check_time", "player_id", "player_name", "date", "hour", "dow")
+
+
+class ArchivedSlice(NamedTuple):
+    """Строка архива: игрок в одном срезе."""
+
+    check_time: datetime
+    player_id: int
+    player_name: str
+    date: date
+    hour: int
+    dow: int
+
+
+def archive_path(directory: str | os.PathLike, day: date) -> Path:
+    """Путь к файлу архива за ``day``."""
+    return Path(directory) / f"{ARCHIVE_PREFIX}{day.isoformat()}{ARCHIVE_SUFFIX}"
+
+
+async def export_partition(
+    conn,
+    partition: str,
+    day: date,
+    directory: str | os.PathLike,
+    *,
+    filter_day: bool = False,
+) -> Path:
+    """Выгружает секцию ``partition`` за ``day`` в сжатый CSV.
+
+    ``filter_day`` ограничивает выгрузку строками за ``day`` — нужно для
+    DEFAULT-секции, где лежат строки разных дней. Файл пишется во временный
+    и переименовывается после успешной выгрузки, поэтому в архиве не
+    бывает обрезанных файлов.
+    """
+    args = []
+    where = ""
+    if filter_day:
+        start = datetime.combine(day, datetime.min.time())
+        args = [start, start + timedelta(days=1)]
+        where = "WHERE h.check_time >= $1 AND h.check_time < $2"
+    path = archive_path(directory, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wb") as output:
+        await conn.copy_from_query(
+            f"""
+            SELECT h.check_time, h.player_id, pl.display_name AS player_name,
+                   h.date, h.hour, h.dow
+            FROM {partition} h
+            JOIN players pl ON pl.id = h.player_id
+            {where}
+            ORDER BY h.check_time, h.player_id
+            """,
+            *args,
+            output=output,
+            format="csv",
+            header=True,
+        )
+    os.replace(tmp_path, path)
+    return path
+
+
+def iter_archive(
+    directory: str | os.PathLike,
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Iterator[ArchivedSlice]:
+    """Перебирает строки архива за дни ``start``..``end`` включительно."""
+    for path in sorted(Path(directory).glob(f"{ARCHIVE_PREFIX}*{ARCHIVE_SUFFIX}")):
+        try:
+            day = date.fromisoformat(path.name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)])
+        except ValueError:
+            continue
+        if (start and day < start) or (end and day > end):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                yield ArchivedSlice(
+                    check_time=datetime.fromisoformat(row["check_time"]),
+                    player_id=int(row["player_id"]),
+                    player_name=row["player_name"],
+                    date=date.fromisoformat(row["date"]),
+                    hour=int(row["hour"]),
+                    dow=int(row["dow"]),
+                )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Чтение архива срезов онлайна")
+    parser.add_argument("directory", help="каталог с файлами архива")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat)
+    parser.add_argument("--player", help="ник игрока без учёта регистра")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="вывести число срезов по игрокам вместо строк",
+    )
+    args = parser.parse_args(argv)
+
+    rows = iter_archive(args.directory, start=args.start, end=args.end)
+    if args.player:
+        player = args.player.casefold()
+        rows = (r for r in rows if r.player_name.casefold() == player)
+
+    if args.summary:
+        counts = Counter(r.player_name for r in rows)
+        for name, slices in counts.most_common():
+            print(f"{name}\t{slices}")
+        return
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(ARCHIVE_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Секционирование player_online_history по дням."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import List
+
+from asyncpg import Pool
+
+from config.config import HISTORY_PARTITION_DAYS_AHEAD, config
+from utils.history_archive import export_partition
+from utils.helpers import get_moscow_datetime
+from utils.logger import log_debug
+
+HISTORY_TABLE = "player_online_history"
+PARTITION_PREFIX = f"{HISTORY_TABLE}_p"
+DEFAULT_PARTITION = f"{HISTORY_TABLE}_default"
+
+_CREATE_PARENT = f"""
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+        player_id INTEGER NOT NULL,
+        check_time TIMESTAMP NOT NULL,
+        date DATE NOT NULL,
+        hour INTEGER NOT NULL,
+        dow INTEGER NOT NULL
+    ) PARTITION BY RANGE (check_time)
+"""
+
+
+def partition_name(day: date) -> str:
+    """Имя секции с данными за ``day``."""
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _partition_day(name: str) -> date | None:
+    """День секции по её имени или ``None`` для чужих таблиц."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+async def _create_partition(conn, day: date) -> None:
+    await conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {partition_name(day)}
+        PARTITION OF {HISTORY_TABLE}
+        FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')
+        """
+    )
+
+
+async def migrate_history_to_partitions(db_pool: Pool) -> None:
+    """Переводит обычную таблицу истории в секционированную.
+
+    Новая база получает секционированную таблицу сразу. Существующая
+    таблица переименовывается, её строки переносятся в дневные секции, после
+    чего старая таблица удаляется. Всё выполняется в одной транзакции.
+    """
+    async with db_pool.acquire() as conn:
+        relkind = await conn.fetchval(
+            "SELECT relkind::text FROM pg_class WHERE oid = to_regclass($1)",
+            HISTORY_TABLE,
+        )
+        if relkind == "p":
+            return
+        async with conn.transaction():
+            legacy = None
+            if relkind == "r":
+                legacy = f"{HISTORY_TABLE}_legacy"
+                log_debug("[DB] Переводим player_online_history на секции по дням")
+                await conn.execute(f"ALTER TABLE {HISTORY_TABLE} RENAME TO {legacy}")
+                # Имена индексов нужны для секционированной таблицы
+                await conn.execute(
+                    """
+                    DROP INDEX IF EXISTS
+                        idx_online_name_date_hour,
+                        idx_online_player_date_hour,
+                        idx_online_check_time,
+                        uq_online_slice_player
+                    """
+                )
+            await conn.execute(_CREATE_PARENT)
+            await conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} "
+                f"PARTITION OF {HISTORY_TABLE} DEFAULT"
+            )
+            if legacy is None:
+                return
+
+            first = await conn.fetchval(f"SELECT MIN(check_time)::date FROM {legacy}")
+            today = get_moscow_datetime().date()
+            day = first or today
+            while day <= today:
+                await _create_partition(conn, day)
+                day += timedelta(days=1)
+            moved = await conn.execute(
+                f"""
+                INSERT INTO {HISTORY_TABLE} (player_id, check_time, date, hour, dow)
+                SELECT player_id, check_time, date, hour, dow FROM {legacy}
+                """
+            )
+            await conn.execute(f"DROP TABLE {legacy}")
+            log_debug(f"[DB] История перенесена в секции: {moved}")
+
+
+async def ensure_partitions(
+    db_pool: Pool, *, days_ahead: int = HISTORY_PARTITION_DAYS_AHEAD
+) -> None:
+    """Создаёт секции с сегодняшнего дня на ``days_ahead`` дней вперёд."""
+    today = get_moscow_datetime().date()
+    async with db_pool.acquire() as conn:
+        for offset in range(days_ahead + 1):
+            day = today + timedelta(days=offset)
+            try:
+                await _create_partition(conn, day)
+            except Exception as e:
+                # Например, строки за этот день уже попали в DEFAULT-секцию
+                log_debug(f"[DB] Не удалось создать секцию {partition_name(day)}: {e}")
+
+
+async def drop_expired_partitions(
+    db_pool: Pool, cutoff: datetime, *, archive_dir: str = config.history_archive_dir
+) -> List[str]:
+    """Отсоединяет и удаляет секции, целиком лежащие раньше ``cutoff``.
+
+    Если задан ``archive_dir``, секция сначала выгружается в архив; при
+    ошибке выгрузки она остаётся в базе до следующего запуска.
+    """
+    dropped: List[str] = []
+    async with db_pool.acquire() as conn:
+        names = await conn.fetch(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass($1)
+            """,
+            HISTORY_TABLE,
+        )
+        for row in names:
+            name = row["relname"]
+            day = _partition_day(name)
+            if day is None or datetime.combine(day + timedelta(days=1), datetime.min.time()) > cutoff:
+                continue
+            if archive_dir:
+                try:
+                    path = await export_partition(conn, name, day, archive_dir)
+                    log_debug(f"[DB] Секция {name} выгружена в {path}")
+                except Exception as e:
+                    log_debug(f"[DB] Не удалось выгрузить секцию {name}: {e}")
+                    continue
+            async with conn.transaction():
+                await conn.execute(f"ALTER TABLE {HISTORY_TABLE} DETACH PARTITION {name}")
+                await conn.execute(f"DROP TABLE {name}")
+            dropped.append(name)
+        await _drop_expired_default_rows(conn, cutoff, archive_dir)
+    return dropped
+
+
+async def _drop_expired_default_rows(conn, cutoff: datetime, archive_dir: str) -> None:
+    """Удаляет из DEFAULT-секции дни, целиком лежащие раньше ``cutoff``.
+
+    В DEFAULT-секцию строки попадают, только если секцию дня не удалось
+    создать. Каждый день архивируется отдельно и удаляется лишь после
+    успешной выгрузки.
+    """
+    days = await conn.fetch(
+        f"""
+        SELECT DISTINCT check_time::date AS day
+        FROM {DEFAULT_PARTITION}
+        WHERE check_time < $1::date
+        ORDER BY day
+        """,
+        cutoff,
+    )
+    for row in days:
+        day = row["day"]
+        start = datetime.combine(day, datetime.min.time())
+        if archive_dir:
+            try:
+                path = await export_partition(
+                    conn, DEFAULT_PARTITION, day, archive_dir, filter_day=True
+                )
+                log_debug(f"[DB] Строки {DEFAULT_PARTITION} за {day} выгружены в {path}")
+            except Exception as e:
+                log_debug(f"[DB] Не удалось выгрузить {DEFAULT_PARTITION} за {day}: {e}")
+                continue
+        await conn.execute(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE check_time >= $1 AND check_time < $2",
+            start,
+            start + timedelta(days=1),
+        )
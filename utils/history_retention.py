@@ -0,0 +1,96 @@
+"""Уровни хранения истории онлайна и их уплотнение.
+
+* сырые срезы ``player_online_history`` — ``cleanup_history_days`` дней,
+  старые секции удаляет ``cleanup_old_online_history_task``;
+* почасовая сводка ``player_hourly_presence`` — ``HOURLY_RETENTION_DAYS`` дней,
+  заполняется при записи каждого среза;
+* дневные итоги ``player_daily_totals`` хранятся бессрочно.
+
+Фоновая задача переносит завершённые дни из почасовой сводки в дневные
+итоги и только после этого удаляет устаревшие часы.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from asyncpg import Pool
+
+from config.config import HOURLY_RETENTION_DAYS, cleanup_task_interval_seconds
+from utils.bot_state import get_state, set_state
+from utils.helpers import get_moscow_datetime
+from utils.logger import log_debug
+
+DAILY_TOTALS_TABLE = "player_daily_totals"
+DAILY_TOTALS_WATERMARK_KEY = "daily_totals_watermark"
+
+
+async def compact_hourly_to_daily(db_pool: Pool) -> None:
+    """Сводит завершённые дни почасовой сводки в ``player_daily_totals``.
+
+    Водяной знак в ``bot_state`` — первый ещё не сведённый день.
+    """
+    today = get_moscow_datetime().replace(hour=0, minute=0, second=0, microsecond=0)
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            raw = await get_state(conn, DAILY_TOTALS_WATERMARK_KEY)
+            if raw is not None:
+                watermark = datetime.fromisoformat(raw)
+            else:
+                first = await conn.fetchval(
+                    "SELECT date_trunc('day', MIN(hour_start)) FROM player_hourly_presence"
+                )
+                watermark = first or today
+            if watermark >= today:
+                log_debug("[RETENTION] Нет завершённых дней для уплотнения")
+                return
+
+            result = await conn.execute(
+                f"""
+                INSERT INTO {DAILY_TOTALS_TABLE} (day, player_id, slices, active_hours)
+                SELECT hour_start::date, player_id,
+                       SUM(slices), COUNT(*) FILTER (WHERE active)
+                FROM player_hourly_presence
+                WHERE hour_start >= $1 AND hour_start < $2
+                GROUP BY hour_start::date, player_id
+                ON CONFLICT (day, player_id) DO UPDATE
+                SET slices = EXCLUDED.slices,
+                    active_hours = EXCLUDED.active_hours
+                """,
+                watermark,
+                today,
+            )
+            await set_state(conn, DAILY_TOTALS_WATERMARK_KEY, today.isoformat())
+    log_debug(f"[RETENTION] Дни с {watermark:%d.%m.%Y} сведены: {result}")
+
+
+async def drop_expired_hours(db_pool: Pool, cutoff: datetime) -> None:
+    """Удаляет часы старше ``cutoff``, уже сведённые в дневные итоги."""
+    async with db_pool.acquire() as conn:
+        raw = await get_state(conn, DAILY_TOTALS_WATERMARK_KEY)
+        if raw is None:
+            return
+        upto = min(cutoff, datetime.fromisoformat(raw))
+        result = await conn.execute(
+            "DELETE FROM player_hourly_presence WHERE hour_start < $1", upto
+        )
+    log_debug(f"[RETENTION] Удалены часы до {upto:%d.%m.%Y}: {result}")
+
+
+async def history_compaction_task(bot) -> None:
+    """Раз в сутки уплотняет почасовую сводку и удаляет устаревшие часы."""
+    log_debug("[TASK] Запущен history_compaction_task")
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            await compact_hourly_to_daily(bot.db_pool)
+            cutoff = get_moscow_datetime() - timedelta(days=HOURLY_RETENTION_DAYS)
+            await drop_expired_hours(bot.db_pool, cutoff)
+            await asyncio.sleep(cleanup_task_interval_seconds)
+        except asyncio.CancelledError:
+            log_debug("[TASK] history_compaction_task cancelled")
+            break
+        except Exception as e:
+            log_debug(f"[TASK] history_compaction_task error: {e}")
+            await asyncio.sleep(5)
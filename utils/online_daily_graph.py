@@ -1,15 +1,12 @@
 """Генерация суточного графика количества игроков."""
 
+import io
 from datetime import timedelta
-from pathlib import Path
 from typing import List
 
-import matplotlib.pyplot as plt
-
-from config.config import (
-    ONLINE_DAILY_GRAPH_PATH,
-    ONLINE_DAILY_GRAPH_TITLE,
-)
+from config.config import ONLINE_DAILY_GRAPH_TITLE
+from utils.graph_cache import graph_cache
+from utils.graph_renderers import render_bar_chart
 from utils.helpers import get_moscow_datetime
 from utils.logger import log_debug
 
@@ -33,7 +30,7 @@ async def fetch_daily_online_counts(db_pool) -> List[int]:
             slice_counts AS (
                 SELECT date_trunc('hour', check_time) AS hour_start,
                        check_time,
-                       COUNT(DISTINCT player_name) AS cnt
+                       COUNT(DISTINCT player_id) AS cnt
                 FROM player_online_history
                 WHERE check_time >= $1 AND check_time <= $2
                 GROUP BY hour_start, check_time
@@ -55,32 +52,24 @@ async def fetch_daily_online_counts(db_pool) -> List[int]:
     return [row["count"] for row in rows]
 
 
-def save_daily_online_graph(counts: List[int]) -> str:
-    """Сохраняет PNG-график количества игроков за последние 24 часа."""
+def render_daily_online_graph(hours: List[int], counts: List[int]) -> bytes:
+    """Отрисовывает PNG-график количества игроков по часам."""
+    return render_bar_chart(
+        [str(h) for h in hours],
+        counts,
+        title=ONLINE_DAILY_GRAPH_TITLE,
+        xlabel="Час",
+        ylabel="Игроки",
+        size=(10, 3),
+    )
+
+
+async def build_daily_online_graph(counts: List[int]) -> io.BytesIO:
+    """Возвращает PNG-график количества игроков за последние 24 часа."""
 
     now = get_moscow_datetime()
     start = (now - timedelta(hours=len(counts) - 1)).replace(minute=0, second=0, microsecond=0)
     hours = [(start + timedelta(hours=i)).hour for i in range(len(counts))]
-
-    plt.figure(figsize=(10, 3))
-    plt.bar(range(len(counts)), counts, color="tab:blue")
-
-    plt.xticks(ticks=range(len(hours)), labels=hours)
-    plt.xlim(-0.5, len(hours) - 0.5)
-
-    plt.xlabel("Час")
-    plt.ylabel("Игроки")
-    plt.title(ONLINE_DAILY_GRAPH_TITLE)
-
-    max_val = max(counts) if counts else 0
-    tick_count = max(max_val + 1, 6)
-    plt.yticks(range(tick_count))
-
-    plt.grid(axis="y", linestyle="--", alpha=0.5)
-    plt.tight_layout()
-
-    output_path = Path(ONLINE_DAILY_GRAPH_PATH)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(output_path)
-    plt.close()
-    return str(output_path)
+    return await graph_cache.render(
+        "daily_graph", render_daily_online_graph, hours, list(counts)
+    )
@@ -0,0 +1,157 @@
+"""Запись срезов онлайна в player_online_history."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable
+
+import asyncpg
+from asyncpg import Pool
+
+from config.config import ACTIVE_HOUR_MIN_SLICES
+from utils.logger import log_debug
+from utils.player_sessions import record_slice_sessions
+from utils.players import player_registry
+from utils.weekly_top import record_active_hours, weekly_leaderboard
+
+HISTORY_TABLE = "player_online_history"
+HISTORY_COLUMNS = ("player_id", "check_time", "date", "hour", "dow")
+HOURLY_PRESENCE_TABLE = "player_hourly_presence"
+DAILY_PRESENCE_TABLE = "player_daily_presence"
+DAILY_STATS_TABLE = "daily_online_stats"
+
+
+def _slice_records(slice_time: datetime, player_ids: Iterable[int]) -> list[tuple]:
+    """Строки среза; дата, час и день недели считаются на стороне бота."""
+    # DOW в PostgreSQL: воскресенье = 0
+    dow = (slice_time.weekday() + 1) % 7
+    ids = dict.fromkeys(player_ids)
+    return [
+        (player_id, slice_time, slice_time.date(), slice_time.hour, dow)
+        for player_id in ids
+    ]
+
+
+async def save_online_slice(
+    db_pool: Pool, slice_time: datetime, players: Iterable[str]
+) -> int:
+    """Сохраняет срез ``slice_time`` и обновляет сводки, сессии и лидеров.
+
+    ``slice_time`` — начало среза и его идентификатор: уникальный индекс
+    ``(check_time, player_id)`` не даёт записать срез дважды. Срез
+    пишется целиком одним COPY в одной транзакции со сводкой, поэтому
+    повторная запись того же среза падает на уникальности, ничего не меняет
+    и считается уже выполненной.
+    Возвращает количество добавленных строк.
+    """
+    players = list(players)
+    if not players:
+        return 0
+    ids = await player_registry.resolve(db_pool, players)
+    records = _slice_records(slice_time, ids.values())
+    hour_start = slice_time.replace(minute=0, second=0, microsecond=0)
+    try:
+        async with db_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    HISTORY_TABLE, records=records, columns=HISTORY_COLUMNS
+                )
+                hourly = await conn.fetch(
+                    f"""
+                    INSERT INTO {HOURLY_PRESENCE_TABLE} AS p (
+                        player_id, hour_start, slices, active
+                    )
+                    SELECT player_id, $2, 1, 1 >= $3
+                    FROM unnest($1::int[]) AS player_id
+                    ON CONFLICT (player_id, hour_start) DO UPDATE
+                    SET slices = p.slices + 1,
+                        active = p.slices + 1 >= $3
+                    RETURNING p.player_id, p.slices
+                    """,
+                    [r[0] for r in records],
+                    hour_start,
+                    ACTIVE_HOUR_MIN_SLICES,
+                )
+                # Счётчик дня растёт только на игроков, впервые замеченных за день
+                await conn.execute(
+                    f"""
+                    WITH added AS (
+                        INSERT INTO {DAILY_PRESENCE_TABLE} (day, player_id)
+                        SELECT $2, unnest($1::int[])
+                        ON CONFLICT DO NOTHING
+                        RETURNING 1
+                    )
+                    INSERT INTO {DAILY_STATS_TABLE} AS s (day, unique_players)
+                    SELECT $2, COUNT(*) FROM added
+                    ON CONFLICT (day) DO UPDATE
+                    SET unique_players = s.unique_players + EXCLUDED.unique_players
+                    """,
+                    [r[0] for r in records],
+                    slice_time.date(),
+                )
+                await record_slice_sessions(conn, slice_time, [r[0] for r in records])
+                # Час стал активным именно этим срезом
+                activated = [
+                    r["player_id"]
+                    for r in hourly
+                    if r["slices"] == ACTIVE_HOUR_MIN_SLICES
+                ]
+                if activated:
+                    await record_active_hours(conn, hour_start, activated)
+    except asyncpg.UniqueViolationError:
+        log_debug(f"[DB] Срез {slice_time} уже записан")
+        return 0
+    if activated:
+        names = {player_id: name for name, player_id in ids.items()}
+        weekly_leaderboard.add(hour_start, {pid: names[pid] for pid in activated})
+    return len(records)
+
+
+async def backfill_hourly_presence(db_pool: Pool) -> None:
+    """Заполняет пустую почасовую сводку из сырых срезов."""
+    has_rows = await db_pool.fetchval(
+        f"SELECT EXISTS (SELECT 1 FROM {HOURLY_PRESENCE_TABLE})"
+    )
+    if has_rows:
+        return
+    result = await db_pool.execute(
+        f"""
+        INSERT INTO {HOURLY_PRESENCE_TABLE} (player_id, hour_start, slices, active)
+        SELECT player_id,
+               date_trunc('hour', check_time) AS hour_start,
+               COUNT(*),
+               COUNT(*) >= $1
+        FROM {HISTORY_TABLE}
+        GROUP BY player_id, hour_start
+        ON CONFLICT DO NOTHING
+        """,
+        ACTIVE_HOUR_MIN_SLICES,
+    )
+    log_debug(f"[DB] Почасовая сводка заполнена из истории: {result}")
+
+
+async def backfill_daily_presence(db_pool: Pool) -> None:
+    """Заполняет пустую дневную сводку из сырых срезов."""
+    has_rows = await db_pool.fetchval(
+        f"SELECT EXISTS (SELECT 1 FROM {DAILY_STATS_TABLE})"
+    )
+    if has_rows:
+        return
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                f"""
+                INSERT INTO {DAILY_PRESENCE_TABLE} (day, player_id)
+                SELECT DISTINCT date, player_id FROM {HISTORY_TABLE}
+                ON CONFLICT DO NOTHING
+                """
+            )
+            result = await conn.execute(
+                f"""
+                INSERT INTO {DAILY_STATS_TABLE} (day, unique_players)
+                SELECT day, COUNT(*) FROM {DAILY_PRESENCE_TABLE}
+                GROUP BY day
+                ON CONFLICT DO NOTHING
+                """
+            )
+    log_debug(f"[DB] Дневная сводка заполнена из истории: {result}")
@@ -2,64 +2,47 @@
 
 from __future__ import annotations
 
+import io
 from datetime import timedelta
 
 from utils.helpers import get_moscow_datetime
-from pathlib import Path
 from typing import List, Optional
 
-import matplotlib.pyplot as plt
-
 from config.config import (
     ONLINE_MONTH_DAYS,
-    ONLINE_MONTH_GRAPH_PATH,
     ONLINE_MONTH_GRAPH_TITLE,
 )
+from utils.graph_cache import graph_cache
+from utils.graph_renderers import render_bar_chart
 from utils.logger import log_debug
 
 
-def save_monthly_online_graph(dates: List[str], counts: List[int]) -> str:
-    """Сохраняет PNG-график уникальных игроков по дням."""
-
-    plt.figure(figsize=(10, 4))
-    plt.bar(range(len(counts)), counts, color="tab:blue")
-
-    plt.xticks(ticks=range(len(dates)), labels=dates, rotation=45, ha="right")
-    plt.xlim(-0.5, len(dates) - 0.5)
-
-    plt.xlabel("Дата")
-    plt.ylabel("Уникальные игроки")
-    plt.title(ONLINE_MONTH_GRAPH_TITLE)
-
-    max_val = max(counts) if counts else 0
-    tick_count = max(max_val + 1, 6)
-    plt.yticks(range(tick_count))
+def render_monthly_online_graph(dates: List[str], counts: List[int]) -> bytes:
+    """Отрисовывает PNG-график уникальных игроков по дням."""
+    return render_bar_chart(
+        dates,
+        counts,
+        title=ONLINE_MONTH_GRAPH_TITLE,
+        xlabel="Дата",
+        ylabel="Уникальные игроки",
+        size=(10, 4),
+        rotate_labels=True,
+    )
 
-    plt.grid(axis="y", linestyle="--", alpha=0.5)
-    plt.tight_layout()
 
-    output_path = Path(ONLINE_MONTH_GRAPH_PATH)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(output_path)
-    plt.close()
-
-    return str(output_path)
-
-
-async def generate_online_month_graph(db_pool) -> Optional[str]:
+async def generate_online_month_graph(db_pool) -> Optional[io.BytesIO]:
     """Создаёт PNG-график уникальных игроков по дням."""
-    start_time = get_moscow_datetime() - timedelta(days=ONLINE_MONTH_DAYS)
+    start_date = (get_moscow_datetime() - timedelta(days=ONLINE_MONTH_DAYS)).date()
     try:
+        # Значения за день считаются при записи срезов, здесь только чтение
         rows = await db_pool.fetch(
             """
-            SELECT DATE(check_time) AS day,
-                   COUNT(DISTINCT LOWER(player_name)) AS count
-            FROM player_online_history
-            WHERE check_time >= $1
-            GROUP BY day
+            SELECT day, unique_players AS count
+            FROM daily_online_stats
+            WHERE day >= $1
             ORDER BY day
             """,
-            start_time,
+            start_date,
         )
     except Exception as e:
         log_debug(f"[DB] Error fetching online month data: {e}")
@@ -70,13 +53,14 @@ async def generate_online_month_graph(db_pool) -> Optional[str]:
 
     counts = {row["day"]: row["count"] for row in rows}
 
-    start_date = start_time.date()
     dates = [start_date + timedelta(days=i) for i in range(ONLINE_MONTH_DAYS)]
     values = [counts.get(d, 0) for d in dates]
 
     try:
         tick_labels = [d.strftime("%d.%m") for d in dates]
-        return save_monthly_online_graph(tick_labels, values)
+        return await graph_cache.render(
+            "month_graph", render_monthly_online_graph, tick_labels, values
+        )
     except Exception as e:
         log_debug(f"[GRAPH] Error building online month graph: {e}")
         raise
@@ -0,0 +1,158 @@
+"""Сессии игроков: непрерывные интервалы присутствия на сервере.
+
+Сессия продлевается, если игрок есть в следующем срезе, и начинается
+заново после пропущенного среза. ``ended_at`` — конец последнего среза
+сессии, то есть его начало плюс ``ONLINE_HISTORY_SLICE_MINUTES``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from asyncpg import Pool
+
+from config.config import config
+from utils.logger import log_debug
+from utils.players import canonical_name
+
+SESSIONS_TABLE = "player_sessions"
+
+
+def _slice_step() -> timedelta:
+    return timedelta(minutes=config.online_slice_minutes)
+
+
+async def record_slice_sessions(
+    conn, slice_time: datetime, player_ids: Iterable[int]
+) -> None:
+    """Продлевает сессии игроков среза ``slice_time`` или открывает новые."""
+    await conn.execute(
+        f"""
+        WITH extended AS (
+            UPDATE {SESSIONS_TABLE} s
+            SET ended_at = $3, slices = s.slices + 1
+            WHERE s.player_id = ANY($1::int[]) AND s.ended_at = $2
+            RETURNING s.player_id
+        )
+        INSERT INTO {SESSIONS_TABLE} (player_id, started_at, ended_at, slices)
+        SELECT player_id, $2, $3, 1
+        FROM unnest($1::int[]) AS player_id
+        WHERE player_id NOT IN (SELECT player_id FROM extended)
+        """,
+        list(player_ids),
+        slice_time,
+        slice_time + _slice_step(),
+    )
+
+
+async def backfill_sessions(db_pool: Pool) -> None:
+    """Восстанавливает пустую таблицу сессий из сырых срезов."""
+    has_rows = await db_pool.fetchval(
+        f"SELECT EXISTS (SELECT 1 FROM {SESSIONS_TABLE})"
+    )
+    if has_rows:
+        return
+    # Срезы одной сессии идут подряд с шагом step, поэтому разность
+    # времени среза и его номера у них совпадает. Старые срезы записаны
+    # с секундами, поэтому время усекается до минуты: иначе каждый срез
+    # стал бы отдельной сессией, а её конец не совпал бы с сеткой срезов.
+    result = await db_pool.execute(
+        f"""
+        INSERT INTO {SESSIONS_TABLE} (player_id, started_at, ended_at, slices)
+        SELECT player_id, MIN(slice_time), MAX(slice_time) + $1::interval, COUNT(*)
+        FROM (
+            SELECT player_id, slice_time,
+                   slice_time - ROW_NUMBER() OVER (
+                       PARTITION BY player_id ORDER BY slice_time
+                   ) * $1::interval AS grp
+            FROM (
+                SELECT DISTINCT player_id, date_trunc('minute', check_time) AS slice_time
+                FROM player_online_history
+            ) h
+        ) t
+        GROUP BY player_id, grp
+        """,
+        _slice_step(),
+    )
+    log_debug(f"[DB] Сессии восстановлены из истории: {result}")
+
+
+async def fetch_playtime(
+    db_pool: Pool,
+    start: datetime,
+    end: datetime,
+    *,
+    player_name: Optional[str] = None,
+) -> List[Tuple[str, timedelta]]:
+    """Время игроков на сервере за период, по убыванию.
+
+    ``player_name`` ограничивает выборку одним игроком.
+    """
+    try:
+        rows = await db_pool.fetch(
+            f"""
+            SELECT pl.display_name,
+                   SUM(LEAST(s.ended_at, $2) - GREATEST(s.started_at, $1)) AS played
+            FROM {SESSIONS_TABLE} s
+            JOIN players pl ON pl.id = s.player_id
+            WHERE s.started_at < $2 AND s.ended_at > $1
+              AND ($3::text IS NULL OR pl.canonical_name = $3)
+            GROUP BY pl.id
+            ORDER BY played DESC, pl.display_name
+            """,
+            start,
+            end,
+            canonical_name(player_name) if player_name else None,
+        )
+    except Exception as e:
+        log_debug(f"[DB] Error fetching playtime: {e}")
+        raise
+
+    return [(r["display_name"], r["played"]) for r in rows]
+
+
+async def fetch_peak_concurrency(db_pool: Pool, start: datetime, end: datetime) -> int:
+    """Наибольшее число игроков на сервере одновременно за период."""
+    try:
+        # Окончания сессий учитываются раньше начал в тот же момент
+        peak = await db_pool.fetchval(
+            f"""
+            WITH events AS (
+                SELECT GREATEST(started_at, $1) AS at, 1 AS delta
+                FROM {SESSIONS_TABLE}
+                WHERE started_at < $2 AND ended_at > $1
+                UNION ALL
+                SELECT LEAST(ended_at, $2), -1
+                FROM {SESSIONS_TABLE}
+                WHERE started_at < $2 AND ended_at > $1
+            )
+            SELECT MAX(online) FROM (
+                SELECT SUM(delta) OVER (ORDER BY at, delta) AS online FROM events
+            ) t
+            """,
+            start,
+            end,
+        )
+    except Exception as e:
+        log_debug(f"[DB] Error fetching peak concurrency: {e}")
+        raise
+
+    return int(peak or 0)
+
+
+async def fetch_last_seen(db_pool: Pool, player_name: str) -> Optional[datetime]:
+    """Когда игрок последний раз был на сервере, или ``None``."""
+    try:
+        return await db_pool.fetchval(
+            f"""
+            SELECT MAX(s.ended_at)
+            FROM {SESSIONS_TABLE} s
+            JOIN players pl ON pl.id = s.player_id
+            WHERE pl.canonical_name = $1
+            """,
+            canonical_name(player_name),
+        )
+    except Exception as e:
+        log_debug(f"[DB] Error fetching last seen: {e}")
+        raise
@@ -0,0 +1,218 @@
+"""Справочник игроков: числовой id и каноническое имя."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from asyncpg import Pool
+
+from config.config import ACTIVE_HOUR_MIN_SLICES, config
+from utils.logger import log_debug
+
+PLAYERS_TABLE = "players"
+
+
+def canonical_name(name: str) -> str:
+    """Каноническое имя игрока: регистр ника не различается."""
+    return name.casefold()
+
+
+class PlayerRegistry:
+    """Кэш соответствия ``ник → id`` в памяти процесса.
+
+    Неизвестные ники добавляются в ``players`` одним запросом. Если игрок
+    зашёл с другим регистром ника, обновляется только отображаемое имя,
+    id остаётся прежним.
+    """
+
+    def __init__(self) -> None:
+        self._players: Dict[str, Tuple[int, str]] = {}
+
+    async def resolve(self, db, names: Iterable[str]) -> Dict[str, int]:
+        """Возвращает id для каждого ника из ``names``.
+
+        ``db`` — пул или соединение asyncpg.
+        """
+        names = list(dict.fromkeys(names))
+        pending: Dict[str, str] = {}
+        for name in names:
+            cached = self._players.get(canonical_name(name))
+            if cached is None or cached[1] != name:
+                pending[canonical_name(name)] = name
+        if pending:
+            rows = await db.fetch(
+                f"""
+                INSERT INTO {PLAYERS_TABLE} AS p (canonical_name, display_name)
+                SELECT * FROM unnest($1::text[], $2::text[])
+                ON CONFLICT (canonical_name) DO UPDATE
+                SET display_name = EXCLUDED.display_name
+                RETURNING id, canonical_name, display_name
+                """,
+                list(pending),
+                list(pending.values()),
+            )
+            for row in rows:
+                self._players[row["canonical_name"]] = (row["id"], row["display_name"])
+        return {name: self._players[canonical_name(name)][0] for name in names}
+
+    def clear(self) -> None:
+        """Сбрасывает кэш, например после ручной правки ``players``."""
+        self._players.clear()
+
+
+player_registry = PlayerRegistry()
+
+
+# Таблицы, где раньше хранился ник, и столбец времени для выбора
+# последнего варианта написания
+_LEGACY_NAME_TABLES = {
+    "player_online_history": "check_time",
+    "player_hourly_presence": "hour_start",
+    "player_total_time": "updated_at",
+}
+
+
+async def _has_name_column(conn, table: str) -> bool:
+    return await conn.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+              AND table_name = $1 AND column_name = 'player_name'
+        )
+        """,
+        table,
+    )
+
+
+async def _fill_players(conn, tables: list[str]) -> None:
+    """Заполняет ``players`` и временную таблицу ``player_name_ids``."""
+    last_seen: Dict[str, datetime] = {}
+    for table in tables:
+        column = _LEGACY_NAME_TABLES[table]
+        rows = await conn.fetch(
+            f"SELECT player_name, MAX({column}) AS seen FROM {table} GROUP BY player_name"
+        )
+        for row in rows:
+            seen = row["seen"] or datetime.min
+            last_seen[row["player_name"]] = max(
+                seen, last_seen.get(row["player_name"], datetime.min)
+            )
+
+    # Отображаемое имя — вариант ника, встречавшийся последним
+    display: Dict[str, Tuple[datetime, str]] = {}
+    for name, seen in last_seen.items():
+        key = canonical_name(name)
+        if key not in display or (seen, name) > display[key]:
+            display[key] = (seen, name)
+    await conn.execute(
+        f"""
+        INSERT INTO {PLAYERS_TABLE} (canonical_name, display_name)
+        SELECT * FROM unnest($1::text[], $2::text[])
+        ON CONFLICT (canonical_name) DO NOTHING
+        """,
+        list(display),
+        [name for _, name in display.values()],
+    )
+    ids = {
+        row["canonical_name"]: row["id"]
+        for row in await conn.fetch(f"SELECT id, canonical_name FROM {PLAYERS_TABLE}")
+    }
+    await conn.execute(
+        """
+        CREATE TEMP TABLE player_name_ids (
+            player_name TEXT PRIMARY KEY,
+            player_id INTEGER NOT NULL
+        ) ON COMMIT DROP
+        """
+    )
+    await conn.copy_records_to_table(
+        "player_name_ids",
+        records=[(name, ids[canonical_name(name)]) for name in last_seen],
+    )
+
+
+async def migrate_player_ids(db_pool: Pool) -> None:
+    """Переводит таблицы со столбцом ``player_name`` на ``player_id``.
+
+    Варианты ника, отличающиеся только регистром, сливаются в одного
+    игрока: срезы с одинаковым id схлопываются, почасовые срезы и общие
+    часы суммируются. Всё выполняется в одной транзакции.
+    """
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            tables = [t for t in _LEGACY_NAME_TABLES if await _has_name_column(conn, t)]
+            if not tables:
+                return
+            log_debug(f"[DB] Переводим на player_id: {', '.join(tables)}")
+            await _fill_players(conn, tables)
+
+            if "player_online_history" in tables:
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE merged ON COMMIT DROP AS
+                    SELECT DISTINCT ON (h.check_time, m.player_id)
+                           m.player_id, h.check_time, h.date, h.hour, h.dow
+                    FROM player_online_history h
+                    JOIN player_name_ids m USING (player_name);
+                    TRUNCATE player_online_history;
+                    ALTER TABLE player_online_history
+                        DROP COLUMN player_name,
+                        ADD COLUMN player_id INTEGER NOT NULL;
+                    INSERT INTO player_online_history (player_id, check_time, date, hour, dow)
+                    SELECT player_id, check_time, date, hour, dow FROM merged;
+                    DROP TABLE merged;
+                    """
+                )
+            if "player_hourly_presence" in tables:
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE merged ON COMMIT DROP AS
+                    SELECT m.player_id, p.hour_start, SUM(p.slices)::int AS slices
+                    FROM player_hourly_presence p
+                    JOIN player_name_ids m USING (player_name)
+                    GROUP BY m.player_id, p.hour_start;
+                    TRUNCATE player_hourly_presence;
+                    ALTER TABLE player_hourly_presence
+                        DROP COLUMN player_name,
+                        ADD COLUMN player_id INTEGER NOT NULL REFERENCES players (id),
+                        ADD PRIMARY KEY (player_id, hour_start);
+                    """
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO player_hourly_presence (player_id, hour_start, slices, active)
+                    SELECT player_id, hour_start, LEAST(slices, $2), slices >= $1
+                    FROM merged
+                    """,
+                    ACTIVE_HOUR_MIN_SLICES,
+                    # Оба варианта ника в одном срезе дали бы лишние срезы
+                    60 // config.online_slice_minutes,
+                )
+                await conn.execute("DROP TABLE merged")
+            if "player_total_time" in tables:
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE merged ON COMMIT DROP AS
+                    SELECT m.player_id,
+                           SUM(t.total_hours)::int AS total_hours,
+                           MAX(t.last_processed_at) AS last_processed_at,
+                           MAX(t.updated_at) AS updated_at
+                    FROM player_total_time t
+                    JOIN player_name_ids m USING (player_name)
+                    GROUP BY m.player_id;
+                    TRUNCATE player_total_time;
+                    ALTER TABLE player_total_time
+                        DROP COLUMN id,
+                        DROP COLUMN player_name,
+                        ADD COLUMN player_id INTEGER PRIMARY KEY REFERENCES players (id);
+                    INSERT INTO player_total_time (
+                        player_id, total_hours, last_processed_at, updated_at
+                    )
+                    SELECT player_id, total_hours, last_processed_at, updated_at
+                    FROM merged;
+                    DROP TABLE merged;
+                    """
+                )
+    player_registry.clear()
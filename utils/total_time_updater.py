@@ -3,98 +3,78 @@
 from __future__ import annotations
 
 import asyncio
+from datetime import datetime
 
 from asyncpg import Pool
 
+from utils.bot_state import get_state, set_state
+from utils.helpers import get_moscow_datetime
 from utils.logger import log_debug
 from config.config import config
 
 
+TOTAL_TIME_WATERMARK_KEY = "total_time_watermark"
+
+
+async def _initial_watermark(conn, total_table: str) -> datetime:
+    """Водяной знак для баз, где часы считались прежним способом."""
+    last = await conn.fetchval(
+        f"""
+        SELECT date_trunc('hour', MAX(last_processed_at)) + INTERVAL '1 hour'
+        FROM {total_table}
+        WHERE last_processed_at > '2000-01-01 00:00:00'
+        """
+    )
+    return last or datetime(2000, 1, 1)
+
+
 async def update_total_time(
     db_pool: Pool,
     *,
-    history_table: str = "player_online_history",
+    presence_table: str = "player_hourly_presence",
     total_table: str = "player_total_time",
 ) -> None:
-    """Добавляет игрокам только новые часы из истории."""
+    """Добавляет игрокам часы, завершившиеся после прошлого запуска.
+
+    Глобальный водяной знак в ``bot_state`` — начало первого ещё не
+    обработанного часа. Из почасовой сводки берутся только активные часы от
+    водяного знака до начала текущего часа, поэтому стоимость запуска
+    зависит от объёма новых данных, а не от всей истории.
+    """
 
+    upto = get_moscow_datetime().replace(minute=0, second=0, microsecond=0)
     try:
         async with db_pool.acquire() as conn:
             async with conn.transaction():
-                # Создаём таблицу, если её ещё нет
-                await conn.execute(
-                    f"""
-                    CREATE TABLE IF NOT EXISTS {total_table} (
-                        id SERIAL PRIMARY KEY,
-                        player_name TEXT UNIQUE NOT NULL,
-                        total_hours INTEGER NOT NULL DEFAULT 0,
-                        last_processed_at TIMESTAMP NOT NULL DEFAULT '2000-01-01 00:00:00',
-                        updated_at TIMESTAMP NOT NULL
-                    )
-                    """
-                )
-
-                # Убедимся, что все игроки присутствуют в таблице total_table
-                await conn.execute(
-                    f"""
-                    INSERT INTO {total_table} (player_name, total_hours, last_processed_at, updated_at)
-                    SELECT DISTINCT player_name, 0, NOW(), NOW()
-                    FROM {history_table}
-                    ON CONFLICT (player_name) DO NOTHING
-                    """
-                )
-
-                # Инициализируем игроков без учтённых часов
-                init_rows = await conn.fetch(
-                    f"""
-                    WITH max_ts AS (
-                        SELECT player_name,
-                               MAX(date::timestamp + hour * INTERVAL '1 hour') AS ts
-                        FROM {history_table}
-                        GROUP BY player_name
-                    )
-                    UPDATE {total_table} t
-                    SET last_processed_at = m.ts,
-                        updated_at = NOW()
-                    FROM max_ts m
-                    WHERE t.player_name = m.player_name
-                      AND t.last_processed_at = '2000-01-01 00:00:00'
-                      AND m.ts IS NOT NULL
-                    RETURNING t.player_name
-                    """
-                )
-                if init_rows:
-                    log_debug(f"[TOTAL] Инициализировано {len(init_rows)} игроков")
+                raw = await get_state(conn, TOTAL_TIME_WATERMARK_KEY)
+                if raw is not None:
+                    watermark = datetime.fromisoformat(raw)
+                else:
+                    watermark = await _initial_watermark(conn, total_table)
+                if watermark >= upto:
+                    log_debug("[TOTAL] Нет завершённых часов для обработки")
+                    return
 
-                # Добавляем только новые часы
+                # Засчитываем завершённые активные часы из почасовой сводки
                 updated_rows = await conn.fetch(
                     f"""
-                    WITH hourly AS (
-                        SELECT player_name,
-                               date::timestamp + hour * INTERVAL '1 hour' AS ts
-                        FROM {history_table}
-                        GROUP BY player_name, date, hour
-                        HAVING COUNT(*) >= 3
-                    ),
-                    new_hours AS (
-                        SELECT h.player_name,
-                               COUNT(*) AS hours,
-                               MAX(h.ts) AS max_ts
-                        FROM hourly h
-                        JOIN {total_table} t ON t.player_name = h.player_name
-                        WHERE h.ts > t.last_processed_at
-                          AND t.last_processed_at > '2000-01-01 00:00:00'
-                        GROUP BY h.player_name
+                    INSERT INTO {total_table} AS t (
+                        player_id, total_hours, last_processed_at, updated_at
                     )
-                    UPDATE {total_table} t
-                    SET total_hours = t.total_hours + n.hours,
-                        last_processed_at = n.max_ts,
+                    SELECT player_id, COUNT(*), MAX(hour_start), NOW()
+                    FROM {presence_table}
+                    WHERE active AND hour_start >= $1 AND hour_start < $2
+                    GROUP BY player_id
+                    ON CONFLICT (player_id) DO UPDATE
+                    SET total_hours = t.total_hours + EXCLUDED.total_hours,
+                        last_processed_at = EXCLUDED.last_processed_at,
                         updated_at = NOW()
-                    FROM new_hours n
-                    WHERE t.player_name = n.player_name
-                    RETURNING t.player_name
-                    """
+                    RETURNING t.player_id
+                    """,
+                    watermark,
+                    upto,
                 )
+                await set_state(conn, TOTAL_TIME_WATERMARK_KEY, upto.isoformat())
                 if updated_rows:
                     log_debug(f"[TOTAL] Обновлено {len(updated_rows)} записей")
                 else:
@@ -109,7 +89,7 @@ async def total_time_update_task(
     bot,
     *,
     interval_seconds: int = config.total_time_interval,
-    history_table: str = "player_online_history",
+    presence_table: str = "player_hourly_presence",
     total_table: str = "player_total_time",
 ) -> None:
     """Background task to periodically update player total time."""
@@ -119,7 +99,7 @@ async def total_time_update_task(
         try:
             await update_total_time(
                 bot.db_pool,
-                history_table=history_table,
+                presence_table=presence_table,
                 total_table=total_table,
             )
             await asyncio.sleep(interval_seconds)
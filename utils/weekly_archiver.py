@@ -3,50 +3,98 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import timedelta, datetime
-from typing import List, Tuple
+from datetime import datetime, timedelta
 
 from asyncpg import Pool
 
 from config.config import (
+    WEEKLY_TOP_LAST_TABLE,
     WEEKLY_TOP_LIMIT,
     WEEKLY_TOP_MAX,
     WEEKLY_TOP_WEEKDAY,
     WEEKLY_TOP_HOUR,
 )
-from utils.weekly_top import _get_week_bounds
+from utils.players import player_registry
+from utils.weekly_top import (
+    WEEKLY_LEADERBOARD_TABLE,
+    WEEKLY_TOP_HISTORY_TABLE,
+    _get_week_bounds,
+    fetch_week_rows,
+)
 from utils.helpers import get_moscow_datetime
 from utils.logger import log_debug
 
 
-async def _fetch_top_rows(
-    db_pool: Pool, start: datetime, end: datetime, limit: int
-) -> List[Tuple[str, int]]:
-    """Return weekly top rows from history."""
-    try:
-        rows = await db_pool.fetch(
-            """
-            SELECT player_name, COUNT(*) AS hours
-            FROM (
-                SELECT player_name, date, hour
-                FROM player_online_history
-                WHERE check_time >= $1 AND check_time < $2
-                GROUP BY player_name, date, hour
-                HAVING COUNT(*) >= 3
-            ) AS t
-            GROUP BY player_name
-            ORDER BY hours DESC, player_name
-            LIMIT $3
-            """,
-            start,
-            end,
-            limit,
-        )
-    except Exception as e:
-        log_debug(f"[DB] Error fetching weekly top: {e}")
-        raise
+async def _archive_leaderboard_weeks(conn, before: datetime) -> str:
+    """Copy every ``weekly_leaderboard`` week older than ``before`` to history.
 
-    return [(r["player_name"], int(r["hours"])) for r in rows]
+    Weeks already in ``weekly_top_history`` keep their archived names.
+    """
+    return await conn.execute(
+        f"""
+        INSERT INTO {WEEKLY_TOP_HISTORY_TABLE} (
+            week_start, player_id, player_name, hours
+        )
+        SELECT w.week_start, w.player_id, pl.display_name, w.hours
+        FROM {WEEKLY_LEADERBOARD_TABLE} w
+        JOIN players pl ON pl.id = w.player_id
+        WHERE w.week_start < $1
+        ON CONFLICT DO NOTHING
+        """,
+        before,
+    )
+
+
+async def seed_weekly_top_history(
+    db_pool: Pool, *, table_name: str = WEEKLY_TOP_LAST_TABLE
+) -> None:
+    """Fill ``weekly_top_history`` with weeks stored before it existed.
+
+    Past ``weekly_leaderboard`` weeks are copied as is. If last week is still
+    missing, it is taken from ``table_name``, the snapshot shown by
+    ``/top7lastweek``.
+    """
+    current = _get_week_bounds()[0]
+    last_week = current - timedelta(days=7)
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            result = await _archive_leaderboard_weeks(conn, current)
+            log_debug(f"[ARCHIVER] Прошедшие недели перенесены в архив: {result}")
+            has_last_week = await conn.fetchval(
+                f"SELECT EXISTS (SELECT 1 FROM {WEEKLY_TOP_HISTORY_TABLE} "
+                "WHERE week_start = $1)",
+                last_week,
+            )
+            if has_last_week:
+                return
+            # The snapshot table is created by the first archive run
+            if await conn.fetchval("SELECT to_regclass($1)", table_name) is None:
+                return
+            rows = await conn.fetch(
+                f'SELECT player_name, hours FROM "{table_name}"'
+            )
+            if not rows:
+                return
+            ids = await player_registry.resolve(
+                conn, [r["player_name"] for r in rows]
+            )
+            await conn.executemany(
+                f"""
+                INSERT INTO {WEEKLY_TOP_HISTORY_TABLE} (
+                    week_start, player_id, player_name, hours
+                )
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT DO NOTHING
+                """,
+                [
+                    (last_week, ids[r["player_name"]], r["player_name"], r["hours"])
+                    for r in rows
+                ],
+            )
+            log_debug(
+                f"[ARCHIVER] Неделя {last_week:%d.%m.%Y} взята из {table_name}: "
+                f"{len(rows)} игроков"
+            )
 
 
 async def archive_weekly_top(
@@ -56,13 +104,17 @@ async def archive_weekly_top(
     limit: int = WEEKLY_TOP_LIMIT,
     max_fetch: int = WEEKLY_TOP_MAX,
 ) -> None:
-    """Calculate last week's top players and store them in the table."""
+    """Store a snapshot of last week's leaderboard in the table.
+
+    The whole leaderboard is also appended to ``weekly_top_history``, which
+    keeps every archived week.
+    """
     start, end = _get_week_bounds()
     start -= timedelta(days=7)
     end -= timedelta(days=7)
     log_debug(f"[ARCHIVER] Период с {start} по {end}")
 
-    rows = await _fetch_top_rows(db_pool, start, end, max_fetch)
+    rows = await fetch_week_rows(db_pool, start, max_fetch)
     rows = rows[:limit]
 
     if not rows:
@@ -80,6 +132,8 @@ async def archive_weekly_top(
                     )
                     """
                 )
+                # Also picks up weeks missed while the bot was down
+                await _archive_leaderboard_weeks(conn, end)
                 await conn.execute(
                     f'TRUNCATE TABLE "{table_name}"'
                 )
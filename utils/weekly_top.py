@@ -1,7 +1,7 @@
 """Логика для подсчёта недельного топа игроков."""
 
 from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, Iterable, List, Mapping, Tuple
 
 from config.config import (
     WEEKLY_TOP_LIMIT,
@@ -13,56 +13,238 @@ from utils.helpers import get_moscow_datetime
 from utils.logger import log_debug
 
 
-def _get_week_bounds() -> tuple[datetime, datetime]:
-    """Возвращает начало и конец недельного периода."""
-    now = get_moscow_datetime()
-    start = now.replace(
+WEEKLY_LEADERBOARD_TABLE = "weekly_leaderboard"
+WEEKLY_TOP_HISTORY_TABLE = "weekly_top_history"
+
+# (id игрока, имя, часы)
+WeekEntry = Tuple[int, str, int]
+
+
+def get_week_start(moment: datetime) -> datetime:
+    """Возвращает начало недельного периода, в который попадает ``moment``."""
+    start = moment.replace(
         hour=WEEKLY_TOP_HOUR,
         minute=0,
         second=0,
         microsecond=0,
     )
-    days_since = (now.weekday() - WEEKLY_TOP_WEEKDAY) % 7
+    days_since = (moment.weekday() - WEEKLY_TOP_WEEKDAY) % 7
     start -= timedelta(days=days_since)
-    if now < start:
+    if moment < start:
         start -= timedelta(days=7)
+    return start
+
+
+def _get_week_bounds() -> tuple[datetime, datetime]:
+    """Возвращает начало и конец недельного периода."""
+    start = get_week_start(get_moscow_datetime())
     end = start + timedelta(days=7)
     return start, end
 
 
-async def generate_weekly_top(db_pool) -> str:
-    """Формирует текстовое сообщение с топом игроков за неделю."""
-    start, end = _get_week_bounds()
-    log_debug(f"[TOP] Период с {start} по {end}")
+async def fetch_week_rows(
+    db_pool, week_start: datetime, limit: int
+) -> List[Tuple[str, int]]:
+    """Возвращает сохранённую таблицу лидеров недели ``week_start``."""
+    try:
+        rows = await db_pool.fetch(
+            f"""
+            SELECT pl.display_name AS player_name, w.hours
+            FROM {WEEKLY_LEADERBOARD_TABLE} w
+            JOIN players pl ON pl.id = w.player_id
+            WHERE w.week_start = $1
+            ORDER BY w.hours DESC, pl.display_name
+            LIMIT $2
+            """,
+            week_start,
+            limit,
+        )
+    except Exception as e:
+        log_debug(f"[DB] Error fetching weekly leaderboard: {e}")
+        raise
+
+    return [(r["player_name"], int(r["hours"])) for r in rows]
+
+
+async def record_active_hours(
+    conn, hour_start: datetime, player_ids: Iterable[int]
+) -> None:
+    """Добавляет игрокам час в таблицу лидеров недели, куда попадает час."""
+    await conn.execute(
+        f"""
+        INSERT INTO {WEEKLY_LEADERBOARD_TABLE} AS w (week_start, player_id, hours)
+        SELECT $1, unnest($2::int[]), 1
+        ON CONFLICT (week_start, player_id) DO UPDATE
+        SET hours = w.hours + 1
+        """,
+        get_week_start(hour_start),
+        list(player_ids),
+    )
+
+
+class WeeklyLeaderboard:
+    """Таблица лидеров текущей недели в памяти процесса.
+
+    Часы добавляются, когда час игрока становится активным при записи
+    среза; то же изменение в той же транзакции сохраняется в
+    ``weekly_leaderboard``, откуда таблица загружается при запуске.
+    Игроков за неделю — десятки, поэтому топ сортируется при чтении.
+    """
+
+    def __init__(self) -> None:
+        self.week_start: datetime | None = None
+        self._hours: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+
+    async def load(self, db_pool) -> None:
+        """Загружает текущую неделю, при необходимости из почасовой сводки."""
+        start, end = _get_week_bounds()
+        async with db_pool.acquire() as conn:
+            has_rows = await conn.fetchval(
+                f"SELECT EXISTS (SELECT 1 FROM {WEEKLY_LEADERBOARD_TABLE} "
+                "WHERE week_start = $1)",
+                start,
+            )
+            if not has_rows:
+                # Первый запуск: неделя до этого момента берётся из сводки
+                await conn.execute(
+                    f"""
+                    INSERT INTO {WEEKLY_LEADERBOARD_TABLE} (week_start, player_id, hours)
+                    SELECT $1, player_id, COUNT(*)
+                    FROM player_hourly_presence
+                    WHERE active AND hour_start >= $1 AND hour_start < $2
+                    GROUP BY player_id
+                    ON CONFLICT DO NOTHING
+                    """,
+                    start,
+                    end,
+                )
+            rows = await conn.fetch(
+                f"""
+                SELECT w.player_id, w.hours, pl.display_name
+                FROM {WEEKLY_LEADERBOARD_TABLE} w
+                JOIN players pl ON pl.id = w.player_id
+                WHERE w.week_start = $1
+                """,
+                start,
+            )
+        self.week_start = start
+        self._hours = {r["player_id"]: r["hours"] for r in rows}
+        self._names = {r["player_id"]: r["display_name"] for r in rows}
+        log_debug(f"[TOP] Таблица лидеров недели загружена: {len(rows)} игроков")
+
+    def add(self, hour_start: datetime, names: Mapping[int, str]) -> None:
+        """Добавляет по часу игрокам ``names`` (``id → отображаемое имя``)."""
+        week_start = get_week_start(hour_start)
+        if self.week_start is None or week_start > self.week_start:
+            self.week_start = week_start
+            self._hours.clear()
+            self._names.clear()
+        elif week_start < self.week_start:
+            return
+        for player_id, name in names.items():
+            self._hours[player_id] = self._hours.get(player_id, 0) + 1
+            self._names[player_id] = name
+
+    def entries(self) -> List[WeekEntry]:
+        """Возвращает всех игроков текущей недели по убыванию часов."""
+        if self.week_start != _get_week_bounds()[0]:
+            return []
+        return sorted(
+            ((pid, self._names[pid], hours) for pid, hours in self._hours.items()),
+            key=lambda row: (-row[2], row[1]),
+        )
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        """Возвращает первых ``limit`` игроков текущей недели."""
+        return [(name, hours) for _, name, hours in self.entries()[:limit]]
+
+
+weekly_leaderboard = WeeklyLeaderboard()
+
+
+async def fetch_archived_week(db_pool, week_start: datetime) -> List[WeekEntry]:
+    """Возвращает архивную таблицу лидеров недели ``week_start``."""
     try:
         rows = await db_pool.fetch(
-            """
-            SELECT player_name, COUNT(*) AS hours
-            FROM (
-                SELECT player_name, date, hour
-                FROM player_online_history
-                WHERE check_time >= $1 AND check_time < $2
-                GROUP BY player_name, date, hour
-                HAVING COUNT(*) >= 3
-            ) AS t
-            GROUP BY player_name
+            f"""
+            SELECT player_id, player_name, hours
+            FROM {WEEKLY_TOP_HISTORY_TABLE}
+            WHERE week_start = $1
             ORDER BY hours DESC, player_name
-            LIMIT $3
             """,
-            start,
-            end,
-            WEEKLY_TOP_MAX,
+            week_start,
         )
     except Exception as e:
-        log_debug(f"[DB] Error fetching weekly top: {e}")
+        log_debug(f"[DB] Error fetching weekly top history: {e}")
         raise
 
+    return [(r["player_id"], r["player_name"], int(r["hours"])) for r in rows]
+
+
+async def _week_entries(
+    db_pool, weeks_ago: int
+) -> Tuple[datetime, List[WeekEntry]]:
+    """Текущая неделя берётся из памяти, прошедшие — из архива."""
+    start = _get_week_bounds()[0] - timedelta(days=7 * weeks_ago)
+    if weeks_ago == 0:
+        if weekly_leaderboard.week_start is None:
+            await weekly_leaderboard.load(db_pool)
+        return start, weekly_leaderboard.entries()
+    return start, await fetch_archived_week(db_pool, start)
+
+
+def _week_label(start: datetime) -> str:
+    end = start + timedelta(days=6)
+    return f"{start:%d.%m}–{end:%d.%m.%Y}"
+
+
+async def generate_weekly_top(
+    db_pool, *, weeks_ago: int = 0, compare_weeks_ago: int | None = None
+) -> str:
+    """Формирует текстовое сообщение с топом игроков за неделю.
+
+    ``weeks_ago`` выбирает неделю (0 — текущая), ``compare_weeks_ago`` —
+    неделю для сравнения часов с выбранной.
+    """
+    start, entries = await _week_entries(db_pool, weeks_ago)
+    if compare_weeks_ago is not None:
+        return await _generate_comparison(
+            db_pool, start, entries, compare_weeks_ago
+        )
+    rows = [(name, hours) for _, name, hours in entries[:WEEKLY_TOP_MAX]]
+
     if not rows:
         return "Нет данных за неделю."
 
     limit = min(WEEKLY_TOP_LIMIT, len(rows))
-    lines: List[str] = [f"\U0001f4ca ТОП {limit} игроков за неделю:"]
-    for idx, row in enumerate(rows[:limit], start=1):
-        lines.append(f"{idx}. {row['player_name']} — {row['hours']} ч")
+    if weeks_ago == 0:
+        title = f"\U0001f4ca ТОП {limit} игроков за неделю:"
+    else:
+        title = f"\U0001f4ca ТОП {limit} игроков за неделю {_week_label(start)}:"
+    lines: List[str] = [title]
+    for idx, (name, hours) in enumerate(rows[:limit], start=1):
+        lines.append(f"{idx}. {name} — {hours} ч")
+
+    return "\n".join(lines)
+
+
+async def _generate_comparison(
+    db_pool, start: datetime, entries: List[WeekEntry], other_weeks_ago: int
+) -> str:
+    """Сравнивает часы игроков топа недели ``start`` с другой неделей."""
+    other_start, other_entries = await _week_entries(db_pool, other_weeks_ago)
+    if not entries:
+        return f"Нет данных за неделю {_week_label(start)}."
+
+    other_hours = {pid: hours for pid, _, hours in other_entries}
+    limit = min(WEEKLY_TOP_LIMIT, len(entries))
+    lines: List[str] = [
+        f"\U0001f4ca ТОП {limit} игроков: {_week_label(start)} "
+        f"против {_week_label(other_start)}:"
+    ]
+    for idx, (pid, name, hours) in enumerate(entries[:limit], start=1):
+        before = other_hours.get(pid, 0)
+        lines.append(f"{idx}. {name} — {hours} ч ({before} ч, {hours - before:+d})")
 
     return "\n".join(lines)
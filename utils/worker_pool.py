@@ -0,0 +1,105 @@
+"""Пул исполнителей для CPU-нагруженных этапов вне event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.config import config
+from utils.logger import log_debug
+
+
+def _timed_call(func: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, float]:
+    """Выполняет ``func`` в исполнителе и замеряет время работы."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+@dataclass
+class StageStats:
+    """Статистика выполнения одного этапа в пуле."""
+
+    runs: int = 0
+    last_run: float = 0.0
+    max_run: float = 0.0
+    total_run: float = 0.0
+    last_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class WorkerPool:
+    """Выполняет синхронные функции в пуле потоков или процессов.
+
+    Для каждого этапа собирается время работы и ожидания в очереди, а
+    ``queue_depth`` показывает, сколько задач ждут свободного исполнителя.
+    В режиме ``process`` функция и аргументы должны сериализоваться pickle.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 2) -> None:
+        if kind not in {"thread", "process"}:
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self.stats: Dict[str, StageStats] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Количество задач, ожидающих свободного исполнителя."""
+        return max(0, self._in_flight - self.max_workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="worker"
+                )
+        return self._executor
+
+    async def run(
+        self, stage: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Выполняет ``func(*args, **kwargs)`` в пуле и возвращает результат."""
+        if kwargs:
+            func = functools.partial(func, **kwargs)
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        self._in_flight += 1
+        queued = self.queue_depth
+        try:
+            result, elapsed = await loop.run_in_executor(
+                self._get_executor(), _timed_call, func, args
+            )
+        finally:
+            self._in_flight -= 1
+
+        wait = max(0.0, time.perf_counter() - submitted - elapsed)
+        stats = self.stats.setdefault(stage, StageStats())
+        stats.runs += 1
+        stats.last_run = elapsed
+        stats.max_run = max(stats.max_run, elapsed)
+        stats.total_run += elapsed
+        stats.last_wait = wait
+        stats.max_wait = max(stats.max_wait, wait)
+        log_debug(
+            f"[WORKERS] {stage}: работа {elapsed:.3f} с, ожидание {wait:.3f} с, "
+            f"очередь {queued}"
+        )
+        return result
+
+    def shutdown(self) -> None:
+        """Останавливает исполнителей, не дожидаясь очереди."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+worker_pool = WorkerPool(config.worker_pool_kind, config.worker_pool_size)